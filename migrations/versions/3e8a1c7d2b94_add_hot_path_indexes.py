@@ -0,0 +1,89 @@
+"""Add hot path indexes for orders, order items, addresses and payments
+
+Revision ID: 3e8a1c7d2b94
+Revises: fc78b8a9f8e2
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3e8a1c7d2b94"
+down_revision: Union[str, None] = "fc78b8a9f8e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_ORDERS_PREDICATE = (
+    "order_status <> 'CANCELLED'::orderstatus AND order_status <> 'DELIVERED'::orderstatus"
+)
+
+
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction, so every
+# statement runs in an autocommit block and does not lock writes on orders.
+# customers.user_id is already covered by the uq index of its unique constraint.
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_customer_id_status_created_at",
+            "orders",
+            ["customer_id", "order_status", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_orders_active_created_at",
+            "orders",
+            ["created_at", "uid"],
+            postgresql_where=sa.text(ACTIVE_ORDERS_PREDICATE),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_orderItems_order_id",
+            "orderItems",
+            ["order_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_delivery_addresses_customer_id",
+            "delivery_addresses",
+            ["customer_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_payments_order_id",
+            "payments",
+            ["order_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_payments_order_id", table_name="payments", postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_delivery_addresses_customer_id",
+            table_name="delivery_addresses",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_orderItems_order_id",
+            table_name="orderItems",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_orders_active_created_at",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_orders_customer_id_status_created_at",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,37 @@
+"""Add keyset pagination index on items
+
+Revision ID: 7b2f4d9e6a15
+Revises: 3e8a1c7d2b94
+Create Date: 2026-10-18 11:02:47.611092
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2f4d9e6a15"
+down_revision: Union[str, None] = "3e8a1c7d2b94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_items_name_uid",
+            "items",
+            ["name", "uid"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_items_name_uid", table_name="items", postgresql_concurrently=True
+        )
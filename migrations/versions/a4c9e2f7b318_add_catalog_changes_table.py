@@ -0,0 +1,41 @@
+"""Add catalog changes table
+
+Revision ID: a4c9e2f7b318
+Revises: 7b2f4d9e6a15
+Create Date: 2026-10-18 14:21:05.338417
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c9e2f7b318"
+down_revision: Union[str, None] = "7b2f4d9e6a15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "catalog_changes",
+        sa.Column("version", sa.BIGINT(), autoincrement=True, nullable=False),
+        sa.Column("entity", sa.VARCHAR(length=20), nullable=False),
+        sa.Column("entity_id", sa.UUID(), nullable=False),
+        sa.Column("op", sa.VARCHAR(length=10), nullable=False),
+        sa.Column(
+            "changed_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("version"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("catalog_changes")
@@ -0,0 +1,34 @@
+"""Add image upload tokens on items and categories
+
+Revision ID: b6d2f8e4a913
+Revises: e8b3f6a1c427
+Create Date: 2026-10-18 18:41:27.305918
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+import sqlalchemy.dialects.postgresql as pg
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6d2f8e4a913"
+down_revision: Union[str, None] = "e8b3f6a1c427"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default, so neither table is rewritten
+    op.add_column("items", sa.Column("image_upload_token", pg.UUID(), nullable=True))
+    op.add_column(
+        "categories", sa.Column("image_upload_token", pg.UUID(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("categories", "image_upload_token")
+    op.drop_column("items", "image_upload_token")
@@ -0,0 +1,39 @@
+"""Add category lookup index on itemCategories
+
+Revision ID: d51e7a3c9f02
+Revises: a4c9e2f7b318
+Create Date: 2026-10-18 15:04:36.912740
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d51e7a3c9f02"
+down_revision: Union[str, None] = "a4c9e2f7b318"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_itemCategories_category_id_item_id",
+            "itemCategories",
+            ["category_id", "item_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_itemCategories_category_id_item_id",
+            table_name="itemCategories",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,56 @@
+"""Add full text and trigram search on items
+
+Revision ID: e8b3f6a1c427
+Revises: d51e7a3c9f02
+Create Date: 2026-10-18 16:12:09.481527
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8b3f6a1c427"
+down_revision: Union[str, None] = "d51e7a3c9f02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Adding a stored generated column rewrites items once
+    op.execute(
+        """
+        ALTER TABLE items ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_items_search_vector",
+            "items",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY ix_items_name_trgm "
+            "ON items USING gin (lower(name) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_items_name_trgm", table_name="items", postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_items_search_vector", table_name="items", postgresql_concurrently=True
+        )
+    op.drop_column("items", "search_vector")
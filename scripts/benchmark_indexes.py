@@ -0,0 +1,197 @@
+"""Compare query plans of the hot order queries with and without the hot path indexes.
+
+Run from the repository root against a development database:
+
+    python -m scripts.benchmark_indexes --seed-orders 200000
+    python -m scripts.benchmark_indexes
+
+The "after" plans run with the indexes from migration 3e8a1c7d2b94 in place.
+The "before" plans drop those indexes inside a transaction that is rolled back,
+so the schema is unchanged when the script exits. DROP INDEX takes an exclusive
+lock on each table for the length of that transaction, so never run this
+against production.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+import argparse
+import asyncio
+import json
+import uuid
+
+from src.config import settings
+
+HOT_PATH_INDEXES = [
+    "ix_orders_customer_id_status_created_at",
+    "ix_orders_active_created_at",
+    '"ix_orderItems_order_id"',
+    "ix_delivery_addresses_customer_id",
+    "ix_payments_order_id",
+]
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO users (uid, firstname, lastname, email, phone, password_hash, role, created_at, updated_at)
+    SELECT gen_random_uuid(), 'Bench', 'User ' || g, :tag || '-' || g || '@bench.local',
+           right(:tag, 8) || g, 'not-a-real-hash', 'CUSTOMER', now(), now()
+    FROM generate_series(1, :customers) AS g
+    """,
+    """
+    INSERT INTO customers (uid, user_id, is_verified)
+    SELECT gen_random_uuid(), u.uid, true FROM users u WHERE u.email LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO delivery_addresses (uid, customer_id, address_line_1, city, postal_code)
+    SELECT gen_random_uuid(), c.uid, 'Bench Street', 'Mumbai', '400001'
+    FROM customers c JOIN users u ON u.uid = c.user_id WHERE u.email LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO items (uid, name, description, sku, size, price, image)
+    SELECT gen_random_uuid(), 'Bench Pizza ' || g, 'Benchmark item', :tag || '-sku-' || g,
+           'MEDIUM', 199.00 + g, 'https://example.com/bench.png'
+    FROM generate_series(1, 50) AS g
+    """,
+    """
+    WITH bench_customers AS (
+        SELECT c.uid AS customer_id, a.uid AS address_id, row_number() OVER () AS rn
+        FROM customers c
+        JOIN users u ON u.uid = c.user_id
+        JOIN delivery_addresses a ON a.customer_id = c.uid
+        WHERE u.email LIKE :tag || '-%'
+    )
+    INSERT INTO orders (uid, customer_id, delivery_type, order_status, address_id, created_at, updated_at)
+    SELECT gen_random_uuid(), bc.customer_id, 'HOME_DELIVERY',
+           (CASE WHEN random() < 0.95 THEN 'DELIVERED'
+                 WHEN random() < 0.5 THEN 'CANCELLED'
+                 ELSE 'PREPARING' END)::orderstatus,
+           bc.address_id, t.created_at, t.created_at
+    FROM generate_series(1, :orders) AS g
+    JOIN bench_customers bc ON bc.rn = 1 + (g % :customers)
+    CROSS JOIN LATERAL (SELECT now() - random() * interval '180 days' AS created_at) t
+    """,
+    """
+    INSERT INTO "orderItems" (uid, order_id, item_id, quantity, price_at_order_time)
+    SELECT gen_random_uuid(), o.uid, i.uid, 2, i.price * 2
+    FROM orders o
+    JOIN customers c ON c.uid = o.customer_id
+    JOIN users u ON u.uid = c.user_id
+    -- the reference to o.uid makes the lateral subquery pick new items per order
+    JOIN LATERAL (
+        SELECT uid, price FROM items WHERE sku LIKE :tag || '-sku-%'
+        ORDER BY random() + (o.uid IS NULL)::int LIMIT 2
+    ) i ON true
+    WHERE u.email LIKE :tag || '-%'
+    """,
+    """
+    INSERT INTO payments (uid, transaction_id, order_id, payment_method, payment_status, amount, created_at, updated_at)
+    SELECT gen_random_uuid(), 'bench-' || o.uid, o.uid, 'UPI', 'COMPLETED', 398.00, now(), now()
+    FROM orders o
+    JOIN customers c ON c.uid = o.customer_id
+    JOIN users u ON u.uid = c.user_id
+    WHERE u.email LIKE :tag || '-%'
+    """,
+]
+
+SAMPLE_QUERY = """
+    SELECT o.uid AS order_id, o.customer_id, a.uid AS address_id
+    FROM orders o JOIN delivery_addresses a ON a.customer_id = o.customer_id
+    ORDER BY o.created_at DESC LIMIT 1
+"""
+
+HOT_QUERIES = {
+    "get_all_customer_orders": """
+        SELECT * FROM orders
+        WHERE customer_id = :customer_id AND order_status = 'DELIVERED'
+        ORDER BY created_at DESC, uid DESC LIMIT 50
+    """,
+    "get_uncompleted_orders": """
+        SELECT * FROM orders
+        WHERE created_at >= now() - interval '1 day'
+          AND order_status <> 'CANCELLED' AND order_status <> 'DELIVERED'
+        ORDER BY created_at, uid LIMIT 50
+    """,
+    "order_items_by_order": """
+        SELECT * FROM "orderItems" WHERE order_id = :order_id
+    """,
+    "addresses_by_customer": """
+        SELECT * FROM delivery_addresses WHERE customer_id = :customer_id
+    """,
+    "payments_by_order": """
+        SELECT * FROM payments WHERE order_id = :order_id
+    """,
+}
+
+
+async def seed(connection, customers: int, orders: int):
+    tag = f"bench-{uuid.uuid4().hex[:8]}"
+    for statement in SEED_STATEMENTS:
+        await connection.execute(
+            text(statement), {"tag": tag, "customers": customers, "orders": orders}
+        )
+    seeded_tables = (
+        "users",
+        "customers",
+        "delivery_addresses",
+        "orders",
+        '"orderItems"',
+        "payments",
+    )
+    for table in seeded_tables:
+        await connection.execute(text(f"ANALYZE {table}"))
+    print(f"Seeded {customers} customers and {orders} orders with tag {tag}")
+
+
+async def explain_all(connection, params: dict) -> dict:
+    plans = {}
+    for name, query in HOT_QUERIES.items():
+        result = await connection.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params
+        )
+        plan = result.scalar_one()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        plans[name] = plan[0]
+    return plans
+
+
+def summarize(plan: dict) -> str:
+    root = plan["Plan"]
+    return f"{plan['Execution Time']:9.3f} ms  {root['Node Type']}"
+
+
+async def main(customers: int, orders: int, seed_only: bool):
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as connection:
+        if orders:
+            await seed(connection, customers, orders)
+    if seed_only:
+        await engine.dispose()
+        return
+
+    async with engine.connect() as connection:
+        sample = (await connection.execute(text(SAMPLE_QUERY))).mappings().first()
+        if sample is None:
+            print("No orders found. Run with --seed-orders first.")
+            await engine.dispose()
+            return
+        params = {"customer_id": sample["customer_id"], "order_id": sample["order_id"]}
+
+        # Everything below runs in the connection's implicit transaction
+        after = await explain_all(connection, params)
+        for index_name in HOT_PATH_INDEXES:
+            await connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        before = await explain_all(connection, params)
+        await connection.rollback()
+
+    print(f"{'query':<28}{'without indexes':<40}{'with indexes'}")
+    for name in HOT_QUERIES:
+        print(f"{name:<28}{summarize(before[name]):<40}{summarize(after[name])}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed-customers", type=int, default=2000)
+    parser.add_argument("--seed-orders", type=int, default=0)
+    parser.add_argument("--seed-only", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.seed_customers, args.seed_orders, args.seed_only))
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.db.main import get_session
+from src.db.main import get_unit_of_work, get_read_session
 from src.db.models import Customer
 from src.auth.dependencies import (
     AccessTokenBearer,
@@ -10,6 +10,8 @@ from src.auth.dependencies import (
     get_current_customer,
 )
 from src.auth.utils import convert_str
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 from .service import AddressService
 from .schema import AddressSchema, UpdateAddressSchema
 
@@ -19,17 +21,20 @@ address_service = AddressService()
 
 @address_router.get("/all")
 async def get_all_delivery_details(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
-        all_delivery_address = await address_service.get_all_address(
-            customer_id=str(customer.uid), session=session
+        all_delivery_address, next_cursor = await address_service.get_all_address(
+            customer_id=str(customer.uid), session=session, cursor=cursor, limit=limit
         )
         return JSONResponse(
             content={
                 "message": "All Addresses fetched successfully",
                 "address_details": all_delivery_address,
+                "next_cursor": next_cursor,
             },
             status_code=status.HTTP_200_OK,
         )
@@ -46,7 +51,7 @@ async def get_all_delivery_details(
 async def create_new_address(
     address_details: AddressSchema,
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         new_address_details = await address_service.create_address(
@@ -75,7 +80,7 @@ async def update_address_details(
     address_id: str,
     updated_address: UpdateAddressSchema,
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         delivery_address_info = await address_service.get_address(
@@ -107,7 +112,7 @@ async def update_address_details(
 async def delete_delivery_details(
     address_id: str,
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         is_deleted = await address_service.delete_address(
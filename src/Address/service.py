@@ -2,6 +2,9 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
 from src.db.models import Delivery_Address, User
 from src.auth.utils import convert_str
+from src.db.loaders import loader_profile
+from src.db.pagination import paginate, DEFAULT_PAGE_SIZE
+from typing import Optional
 from fastapi import status, HTTPException
 import uuid
 
@@ -9,18 +12,33 @@ from .schema import AddressSchema, UpdateAddressSchema
 
 
 class AddressService:
-    async def get_all_address(self, customer_id: str, session: AsyncSession):
+    async def get_all_address(
+        self,
+        customer_id: str,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
         try:
-            statement = select(Delivery_Address).where(
-                Delivery_Address.customer_id == customer_id
+            statement = (
+                select(Delivery_Address)
+                .options(*loader_profile("address_listing"))
+                .where(Delivery_Address.customer_id == customer_id)
+            )
+            address_details, next_cursor = await paginate(
+                session,
+                statement,
+                order_by=[Delivery_Address.uid],
+                cursor=cursor,
+                limit=limit,
             )
-            result = await session.exec(statement)
-            address_details = result.all()
             converted_addresses = [
                 convert_str(address.model_dump()) for address in address_details
             ]
-            return converted_addresses
+            return converted_addresses, next_cursor
 
+        except HTTPException as e:
+            raise e
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -56,7 +74,7 @@ class AddressService:
             print(address_details_dict)
             new_address = Delivery_Address(**address_details_dict)
             session.add(new_address)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_address)
             return new_address
         except Exception as e:
@@ -90,7 +108,7 @@ class AddressService:
                     setattr(address, key, value)
                 else:
                     raise ValueError(f"Invalid key attribute {str(key)}")
-            await session.commit()
+            await session.flush()
             await session.refresh(address)
             return address
         except Exception as e:
@@ -112,7 +130,7 @@ class AddressService:
                     detail=f"Deleting Address of other User is not permitted",
                 )
             await session.delete(delivery_details)
-            await session.commit()
+            await session.flush()
             return True
         except Exception as e:
             raise HTTPException(
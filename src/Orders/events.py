@@ -0,0 +1,155 @@
+from fastapi import Request
+from typing import Optional
+import asyncio
+import json
+import logging
+import re
+
+from src.db.redis import client
+from src.db.models import Order
+from src.db.Types import OrderStatus, Delivery_Type
+
+ORDER_EVENTS_STREAM = "orders:events"
+ORDER_EVENTS_CHANNEL = "orders:events:live"
+ORDER_EVENTS_MAXLEN = 10000
+REPLAY_LIMIT = 1000
+SUBSCRIBER_QUEUE_SIZE = 500
+KEEP_ALIVE_SECONDS = 15
+EVENT_ID_PATTERN = re.compile(r"^\d+-\d+$")
+
+ORDER_CREATED = "order_created"
+ORDER_STATUS_CHANGED = "order_status_changed"
+ORDER_UPDATED = "order_updated"
+ORDER_CANCELLED = "order_cancelled"
+
+
+def order_event_data(order: Order) -> dict:
+    # Built from columns that are still loaded after a flush, updated_at is expired by onupdate
+    return {
+        "uid": str(order.uid),
+        "customer_id": str(order.customer_id),
+        "address_id": str(order.address_id) if order.address_id else None,
+        "delivery_type": Delivery_Type(order.delivery_type).value,
+        "order_status": OrderStatus(order.order_status).value,
+        "created_at": str(order.created_at),
+    }
+
+
+async def publish_order_event(event_type: str, order_data: dict):
+    event_data = json.dumps({"type": event_type, "order": order_data})
+    # The stream keeps history for resuming screens, pub/sub fans out to every worker
+    event_id = await client.xadd(
+        ORDER_EVENTS_STREAM,
+        {"data": event_data},
+        maxlen=ORDER_EVENTS_MAXLEN,
+        approximate=True,
+    )
+    await client.publish(
+        ORDER_EVENTS_CHANNEL,
+        json.dumps({"id": event_id.decode(), "data": event_data}),
+    )
+
+
+def _event_id_key(event_id: str) -> tuple:
+    milliseconds, sequence = event_id.split("-")
+    return int(milliseconds), int(sequence)
+
+
+def _format_sse(event_id: str, event_data: str) -> str:
+    return f"id: {event_id}\nevent: order\ndata: {event_data}\n\n"
+
+
+class OrderEventBroker:
+    """One Redis pub/sub subscription per worker, shared by every connected screen."""
+
+    def __init__(self):
+        self._subscribers: set[asyncio.Queue] = set()
+        self._listener: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+
+    async def _listen(self, listening: asyncio.Event):
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(ORDER_EVENTS_CHANNEL)
+            listening.set()
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                for queue in list(self._subscribers):
+                    if queue.full():
+                        # Slow screen, drop its oldest event. It can resume from the stream.
+                        queue.get_nowait()
+                    queue.put_nowait(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception("Order event listener stopped, closing every screen")
+            self._close_subscribers()
+            # Waiting screens find their stream closed instead of hanging
+            listening.set()
+        finally:
+            await pubsub.aclose()
+
+    def _close_subscribers(self):
+        # Events published while the listener is down would be lost silently. Ending
+        # the streams makes screens reconnect and resume from the stream instead.
+        for queue in list(self._subscribers):
+            self._subscribers.discard(queue)
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._listener is None or self._listener.done():
+            self._listening = asyncio.Event()
+            self._listener = asyncio.create_task(self._listen(self._listening))
+        return queue
+
+    async def wait_until_listening(self):
+        await self._listening.wait()
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+
+order_event_broker = OrderEventBroker()
+
+
+async def order_event_stream(request: Request, last_event_id: Optional[str] = None):
+    if last_event_id and not EVENT_ID_PATTERN.match(last_event_id):
+        last_event_id = None
+    # Subscribe before replaying so nothing published in between is lost
+    queue = order_event_broker.subscribe()
+    try:
+        # The replay only starts once Redis confirmed the SUBSCRIBE
+        await order_event_broker.wait_until_listening()
+        if last_event_id:
+            missed_events = await client.xrange(
+                ORDER_EVENTS_STREAM, min=f"({last_event_id}", max="+", count=REPLAY_LIMIT
+            )
+            for event_id, fields in missed_events:
+                last_event_id = event_id.decode()
+                yield _format_sse(last_event_id, fields[b"data"].decode())
+
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=KEEP_ALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                return
+            event = json.loads(message)
+            if last_event_id and _event_id_key(event["id"]) <= _event_id_key(
+                last_event_id
+            ):
+                continue
+            last_event_id = event["id"]
+            yield _format_sse(event["id"], event["data"])
+    finally:
+        order_event_broker.unsubscribe(queue)
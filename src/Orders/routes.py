@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime, timedelta, timezone
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.db.main import get_session
+from src.db.main import get_unit_of_work, get_read_session
+from src.db.instrumentation import QueryBudget
+from src.db.idempotency import IdempotencyRecord, get_idempotency_record
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.db.etags import (
+    make_etag,
+    etag_matches,
+    not_modified,
+    with_etag,
+    get_resource_version,
+)
+from typing import Optional
 from src.db.models import Customer
 from src.auth.dependencies import (
     RoleChecker,
@@ -10,8 +21,14 @@ from src.auth.dependencies import (
 )
 from src.db.Types import OrderStatus
 from src.auth.utils import convert_str
-from .schemas import OrderSchema, Order_Items_Schema, UpdateOrderSchema
-from .service import OrderService
+from .schemas import (
+    OrderSchema,
+    Order_Items_Schema,
+    UpdateOrderSchema,
+    CheckoutSchema,
+)
+from .service import OrderService, order_etag_key
+from .events import order_event_stream
 
 all_user_checker = Depends(RoleChecker(["admin", "manager", "staff", "customer"]))
 management_checker = Depends(RoleChecker(["admin", "manager", "staff"]))
@@ -19,6 +36,8 @@ customer_checker = Depends(RoleChecker(["customer"]))
 admin_checker = Depends(RoleChecker(["admin"]))
 manager_user = Depends(RoleChecker(["manager"]))
 admin_manager_checker = Depends(RoleChecker(["admin", "manager"]))
+order_detail_budget = Depends(QueryBudget(3))
+idempotency_guard = Depends(get_idempotency_record)
 
 
 order_router = APIRouter()
@@ -28,20 +47,39 @@ order_service = OrderService()
 # TODO :-> Add Payments Services
 # TODO :-> CREATE A CRON SCHEDULE TO CHECK EVERY 30 minutes THAT THE newly created Order has its respective Order-Item Tables or Not
 # IF THERE IS ANY EMPTY ROW with order_id is null in Order_Items with its respective Orders table then Delete that Order
-@order_router.get("/order_detail/{order_id}", dependencies=[all_user_checker])
+@order_router.get(
+    "/order_detail/{order_id}", dependencies=[all_user_checker, order_detail_budget]
+)
 async def get_order_details(
-    order_id: str, session: AsyncSession = Depends(get_session)
+    order_id: str, request: Request, session: AsyncSession = Depends(get_unit_of_work)
 ):
     try:
+        # The version is read before the order, so the ETag never claims newer data
+        order_version = await get_resource_version(order_etag_key(order_id))
+        etag = (
+            make_etag("order", order_id, order_version)
+            if order_version is not None
+            else None
+        )
+        if etag is not None and etag_matches(request, etag):
+            return not_modified(etag)
         order_details = await order_service.get_order(
             order_id=order_id, session=session
         )
-        return JSONResponse(
-            content={
-                "message": f"Order details fetched successfully",
-                "orders": convert_str(order_details.model_dump()),
-            },
-            status_code=status.HTTP_200_OK,
+        order_details_dict = convert_str(order_details.model_dump())
+        order_details_dict["order_items"] = [
+            convert_str(order_item.model_dump())
+            for order_item in order_details.order_items
+        ]
+        return with_etag(
+            JSONResponse(
+                content={
+                    "message": f"Order details fetched successfully",
+                    "orders": order_details_dict,
+                },
+                status_code=status.HTTP_200_OK,
+            ),
+            etag,
         )
 
     except Exception as e:
@@ -55,23 +93,32 @@ async def get_order_details(
 @order_router.get("/all_orders/{order_status}")
 async def get_all_orders(
     order_status: str = "all",
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
         order_status = (
             OrderStatus(order_status) if order_status != "all" else order_status
         )
-        all_orders = await order_service.get_all_customer_orders(
-            customer_id=customer.uid, order_status=order_status, session=session
+        all_orders, next_cursor = await order_service.get_all_customer_orders(
+            customer_id=customer.uid,
+            order_status=order_status,
+            session=session,
+            cursor=cursor,
+            limit=limit,
         )
         return JSONResponse(
             content={
                 "message": f"Order details fetched successfully",
                 "orders": all_orders,
+                "next_cursor": next_cursor,
             },
             status_code=status.HTTP_200_OK,
         )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -83,7 +130,10 @@ async def get_all_orders(
     "/get_uncompleted_orders/{time_range}", dependencies=[management_checker]
 )
 async def get_all_uncompleted_orders(
-    time_range: int, session: AsyncSession = Depends(get_session)
+    time_range: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
         datetime_range = (
@@ -91,16 +141,19 @@ async def get_all_uncompleted_orders(
             if time_range
             else (datetime.now(timezone.utc) - timedelta(minutes=1440))
         )
-        uncomplted_orders = await order_service.get_uncompleted_orders(
-            time_range=datetime_range, session=session
+        uncomplted_orders, next_cursor = await order_service.get_uncompleted_orders(
+            time_range=datetime_range, session=session, cursor=cursor, limit=limit
         )
         return JSONResponse(
             content={
                 "message": f"All Uncompleted Orders under time range {str(datetime_range)}",
                 "orders": uncomplted_orders,
+                "next_cursor": next_cursor,
             }
         )
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -108,22 +161,43 @@ async def get_all_uncompleted_orders(
         )
 
 
+# Live feed for kitchen and packing screens, replaces polling get_uncompleted_orders
+# Reconnecting screens send Last-Event-ID (or ?resume_from=) to receive what they missed
+@order_router.get("/kitchen_feed", dependencies=[management_checker])
+async def stream_kitchen_feed(
+    request: Request,
+    resume_from: Optional[str] = None,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    session: AsyncSession = Depends(get_unit_of_work),
+):
+    # Release the pooled connection used by the role check before the long lived stream
+    await session.close()
+    return StreamingResponse(
+        order_event_stream(request, last_event_id or resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @order_router.post("/create_order")
 async def create_new_order(
     order_info: OrderSchema,
+    idempotency: IdempotencyRecord = idempotency_guard,
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         new_order = await order_service.create_Order(
             customer_id=customer.uid, order_details=order_info, session=session
         )
-        return JSONResponse(
-            content={
-                "message": "Order Successfully Created",
-                "order": convert_str(new_order.model_dump()),
-            },
-            status_code=status.HTTP_201_CREATED,
+        return idempotency.save(
+            JSONResponse(
+                content={
+                    "message": "Order Successfully Created",
+                    "order": convert_str(new_order.model_dump()),
+                },
+                status_code=status.HTTP_201_CREATED,
+            )
         )
 
     except HTTPException as e:
@@ -135,21 +209,58 @@ async def create_new_order(
         )
 
 
+@order_router.post("/checkout")
+async def checkout_order(
+    checkout_details: CheckoutSchema,
+    idempotency: IdempotencyRecord = idempotency_guard,
+    customer: Customer = Depends(get_current_customer),
+    session: AsyncSession = Depends(get_unit_of_work),
+):
+    try:
+        new_order, new_order_items, order_total = await order_service.checkout(
+            customer_id=customer.uid, checkout_details=checkout_details, session=session
+        )
+        order_details_dict = convert_str(new_order.model_dump())
+        order_details_dict["order_items"] = [
+            convert_str(order_item.model_dump()) for order_item in new_order_items
+        ]
+        order_details_dict["total"] = str(order_total)
+        return idempotency.save(
+            JSONResponse(
+                content={
+                    "message": "Order Successfully Placed",
+                    "order": order_details_dict,
+                },
+                status_code=status.HTTP_201_CREATED,
+            )
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error during Checkout -> {str(e)}",
+        )
+
+
 @order_router.post("/create_order_list", dependencies=[customer_checker])
 async def create_order_lists(
     order_item_list: Order_Items_Schema,
-    session: AsyncSession = Depends(get_session),
+    idempotency: IdempotencyRecord = idempotency_guard,
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         new_order_list = await order_service.create_Items_Order_list(
             order_items_list=order_item_list, session=session
         )
-        return JSONResponse(
-            content={
-                "message": "Items Added to Order Successfully",
-                "order_items": new_order_list,
-            },
-            status_code=status.HTTP_200_OK,
+        return idempotency.save(
+            JSONResponse(
+                content={
+                    "message": "Items Added to Order Successfully",
+                    "order_items": new_order_list,
+                },
+                status_code=status.HTTP_200_OK,
+            )
         )
     except HTTPException as e:
         raise e
@@ -164,11 +275,11 @@ async def create_order_lists(
 async def cancel_customer_order(
     order_id: str,
     customer: Customer = Depends(get_current_customer),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         order_details = await order_service.get_order(
-            order_id=order_id, session=session
+            order_id=order_id, session=session, profile="order_listing"
         )
         if order_details is None:
             raise HTTPException(
@@ -207,11 +318,11 @@ async def cancel_customer_order(
 async def update_orders_for_customer(
     order_id: str,
     updated_order: UpdateOrderSchema,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         order_details = await order_service.get_order(
-            order_id=order_id, session=session
+            order_id=order_id, session=session, profile="order_listing"
         )
         if order_details is None:
             raise HTTPException(
@@ -68,6 +68,11 @@ class Item_Quantity(BaseModel):
     quantity: NonNegativeInt = Field(default=1, ge=1, le=20)
 
 
+# Order and its items in a single request
+class CheckoutSchema(OrderSchema):
+    items: List[Item_Quantity] = Field(min_length=1, max_length=50)
+
+
 class Order_Items_Schema(BaseModel):
     order_id: uuid.UUID
     items: List[Item_Quantity]
@@ -1,31 +1,69 @@
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException, status
-from src.db.models import Order, Order_Items, User, Customer
+from src.db.models import Order, Order_Items, User, Customer, Delivery_Address
 from src.auth.utils import convert_str
 from datetime import datetime
-from typing import List
-from .schemas import OrderSchema, Order_Items_Schema, Item_Quantity, UpdateOrderSchema
+from typing import List, Optional
+from .schemas import (
+    OrderSchema,
+    Order_Items_Schema,
+    Item_Quantity,
+    UpdateOrderSchema,
+    CheckoutSchema,
+)
 from src.items_Categories.service import ItemService
 from src.db.Types import OrderStatus
+from src.db.loaders import loader_profile
+from src.db.pagination import paginate, DEFAULT_PAGE_SIZE
+from src.db.main import on_commit
+from src.db.etags import bump_resource_version
+from .events import (
+    publish_order_event,
+    order_event_data,
+    ORDER_CREATED,
+    ORDER_STATUS_CHANGED,
+    ORDER_UPDATED,
+    ORDER_CANCELLED,
+)
+from functools import partial
 import uuid
 
 item_service = ItemService()
 
 
+def order_etag_key(order_id) -> str:
+    return f"order:{str(uuid.UUID(str(order_id)))}"
+
+
 class OrderService:
-    async def get_uncompleted_orders(self, time_range: datetime, session: AsyncSession):
+    async def get_uncompleted_orders(
+        self,
+        time_range: datetime,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
         try:
             statement = (
                 select(Order)
+                .options(*loader_profile("order_listing"))
                 .where(Order.created_at >= time_range)
                 .where(Order.order_status != OrderStatus.CANCELLED)
                 .where(Order.order_status != OrderStatus.DELIVERED)
             )
-            result = (await session.exec(statement))._allrows()
-            print("ALL UNCOMPLETED ORDERS ---> ", result)
+            # Oldest first so the kitchen works the queue in order
+            result, next_cursor = await paginate(
+                session,
+                statement,
+                order_by=[Order.created_at, Order.uid],
+                cursor=cursor,
+                limit=limit,
+            )
             converted_result = [convert_str(order.model_dump()) for order in result]
-            return converted_result
+            return converted_result, next_cursor
+        except HTTPException as e:
+            raise e
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -33,7 +71,12 @@ class OrderService:
             )
 
     async def get_all_customer_orders(
-        self, customer_id: str, order_status: OrderStatus | str, session: AsyncSession
+        self,
+        customer_id: str,
+        order_status: OrderStatus | str,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
     ):
         try:
             if type(order_status) == str and order_status != "all":
@@ -42,25 +85,41 @@ class OrderService:
                     detail=f"{str(order_status)} is not a valid Order status parameter",
                 )
             statement = (
-                select(Order).where(Order.customer_id == customer_id)
-                if order_status == "all"
-                else select(Order)
+                select(Order)
+                .options(*loader_profile("order_listing"))
                 .where(Order.customer_id == customer_id)
-                .where(Order.order_status == order_status)
             )
-            result = (await session.exec(statement))._allrows()
+            if order_status != "all":
+                statement = statement.where(Order.order_status == order_status)
+            # Newest first
+            result, next_cursor = await paginate(
+                session,
+                statement,
+                order_by=[Order.created_at, Order.uid],
+                cursor=cursor,
+                limit=limit,
+                descending=True,
+            )
             converted_result = [convert_str(order.model_dump()) for order in result]
-            return converted_result
+            return converted_result, next_cursor
 
+        except HTTPException as e:
+            raise e
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error getting Order details -> {str(e)}",
             )
 
-    async def get_order(self, order_id: str, session: AsyncSession):
+    async def get_order(
+        self, order_id: str, session: AsyncSession, profile: str = "order_detail"
+    ):
         try:
-            statement = select(Order).where(Order.uid == order_id)
+            statement = (
+                select(Order)
+                .where(Order.uid == order_id)
+                .options(*loader_profile(profile))
+            )
             result = await session.exec(statement)
             order = result.one()
             return order
@@ -78,49 +137,136 @@ class OrderService:
             order_details_dict["customer_id"] = customer_id
             new_order = Order(**order_details_dict)
             session.add(new_order)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_order)
+            on_commit(
+                session,
+                partial(publish_order_event, ORDER_CREATED, order_event_data(new_order)),
+            )
             return new_order
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error Creating New Order : -> {str(e)}",
             )
 
+    # Create the Order and all of its Order Items in one transaction
+    async def checkout(
+        self,
+        customer_id: uuid.UUID,
+        checkout_details: CheckoutSchema,
+        session: AsyncSession,
+    ):
+        try:
+            order_details_dict = checkout_details.model_dump(exclude={"items"})
+            address_id = order_details_dict.get("address_id")
+            if address_id is not None:
+                address_statement = select(Delivery_Address.uid).where(
+                    Delivery_Address.uid == address_id,
+                    Delivery_Address.customer_id == customer_id,
+                )
+                if (await session.exec(address_statement)).first() is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Address with id {str(address_id)} not found for this customer",
+                    )
+
+            # One round trip for every item price
+            item_ids = list({order_item.item_id for order_item in checkout_details.items})
+            # Charged prices always come from the database, never the menu cache
+            item_prices = await item_service.get_item_prices(item_ids, session)
+            missing_items = [
+                str(item_id) for item_id in item_ids if item_id not in item_prices
+            ]
+            if missing_items:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Error getting Item information with ids {', '.join(missing_items)}",
+                )
+
+            new_order = Order(
+                uid=uuid.uuid4(), customer_id=customer_id, **order_details_dict
+            )
+            new_order_items = [
+                Order_Items(
+                    uid=uuid.uuid4(),
+                    order_id=new_order.uid,
+                    item_id=order_item.item_id,
+                    quantity=order_item.quantity,
+                    price_at_order_time=round(
+                        item_prices[order_item.item_id] * order_item.quantity, 2
+                    ),
+                )
+                for order_item in checkout_details.items
+            ]
+            # The flush sends one INSERT for the order and one batched INSERT for the items
+            session.add(new_order)
+            session.add_all(new_order_items)
+            await session.flush()
+            await session.refresh(new_order)
+            on_commit(
+                session,
+                partial(publish_order_event, ORDER_CREATED, order_event_data(new_order)),
+            )
+            order_total = sum(
+                order_item.price_at_order_time for order_item in new_order_items
+            )
+            return new_order, new_order_items, order_total
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error during Checkout : -> {str(e)}",
+            )
+
     # Create Order Item Entry
     async def create_Items_Order_list(
         self, order_items_list: Order_Items_Schema, session: AsyncSession
     ):
         try:
             order_id = order_items_list.order_id
-            order_in_db = await self.get_order(order_id=order_id, session=session)
+            order_in_db = await self.get_order(
+                order_id=order_id, session=session, profile="order_listing"
+            )
             if order_in_db is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Order with id {str(order_id)} not found in the database",
                 )
             items_list: List[Item_Quantity] = order_items_list.items
-            order_item_final_list: List = []
+            item_prices = await item_service.get_item_prices(
+                [order_detail.item_id for order_detail in items_list],
+                session,
+            )
+            new_order_items = []
             for order_detail in items_list:
                 order_info = order_detail.model_dump()
-                item_info = await item_service.get_item(order_detail.item_id, session)
-                if item_info is None:
+                if order_detail.item_id not in item_prices:
                     raise HTTPException(
                         status_code=status.HTTP_404_NOT_FOUND,
                         detail=f"Error getting Item information with id {str(order_detail.item_id)}",
                     )
-                order_price = round(item_info.price * order_detail.quantity, 2)
-                new_order_item = Order_Items(
-                    order_id=order_id, **order_info, price_at_order_time=order_price
+                order_price = round(
+                    item_prices[order_detail.item_id] * order_detail.quantity, 2
                 )
-                session.add(new_order_item)
-                await session.commit()
-                await session.refresh(new_order_item)
-                order_item_final_list.append(convert_str(new_order_item.model_dump()))
+                new_order_items.append(
+                    Order_Items(
+                        uid=uuid.uuid4(),
+                        order_id=order_id,
+                        **order_info,
+                        price_at_order_time=order_price,
+                    )
+                )
+            session.add_all(new_order_items)
+            await session.flush()
+            order_item_final_list: List = [
+                convert_str(new_order_item.model_dump())
+                for new_order_item in new_order_items
+            ]
+            on_commit(session, partial(bump_resource_version, order_etag_key(order_id)))
             return order_item_final_list
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error Creating Orders: {str(e)}",
@@ -149,11 +295,19 @@ class OrderService:
                     setattr(order, key, value)
                 else:
                     raise ValueError(f"Invalid key attribute: {str(key)}")
-            await session.commit()
+            await session.flush()
             await session.refresh(order)
+            event_type = (
+                ORDER_STATUS_CHANGED
+                if "order_status" in updated_order_dict
+                else ORDER_UPDATED
+            )
+            on_commit(
+                session, partial(publish_order_event, event_type, order_event_data(order))
+            )
+            on_commit(session, partial(bump_resource_version, order_etag_key(order.uid)))
             return order
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error Updating Order -> {str(e)}",
@@ -166,11 +320,15 @@ class OrderService:
     ):
         try:
             order.order_status = OrderStatus.CANCELLED
-            await session.commit()
+            await session.flush()
             # await session.refresh(order)
+            on_commit(
+                session,
+                partial(publish_order_event, ORDER_CANCELLED, order_event_data(order)),
+            )
+            on_commit(session, partial(bump_resource_version, order_etag_key(order.uid)))
             return True
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error Updating Order -> {str(e)}",
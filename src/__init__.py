@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from src.config import settings
-from src.db.main import init_db
+from src.db.main import init_db, close_db
+from src.db.replica import ReadYourWritesMiddleware
+from src.db.instrumentation import QueryStatsMiddleware
+from src.db.idempotency import IdempotentReplay, replay_idempotent_response
+from src.items_Categories.suggest import suggest_index
+from src.images.uploads import image_upload_queue
+from src.images.proxy import image_proxy
+from src.auth.utils import password_hash_pool, calibrate_password_hashing
 from pathlib import Path
 from fastapi.staticfiles import StaticFiles
 import logging
@@ -11,6 +18,8 @@ from src.auth.routes import auth_router
 from src.items_Categories.routes import item_router
 from src.Address.routes import address_router
 from src.Orders.routes import order_router
+from src.metrics.routes import metrics_router
+from src.images.routes import image_router
 
 
 APP_VERSION = settings.APP_VERSION
@@ -26,7 +35,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.exception("Database Connection Failed")
         raise e  # Propagate the error
+    await calibrate_password_hashing()
+    try:
+        await suggest_index.rebuild()
+    except Exception:
+        # Typeahead is optional, the first suggest request retries the build
+        logging.exception("Could not build the suggest index")
     yield
+    # Let queued image uploads finish before the pool goes away
+    await image_upload_queue.drain()
+    await image_proxy.close()
+    password_hash_pool.shutdown()
+    await close_db()
     print("Server Stopped running")
 
 
@@ -34,15 +54,23 @@ app = FastAPI(
     title="Pizza Ecommerce Shop",
     description="A REST app of Pizza Delivery Shop",
     version=APP_VERSION,
+    lifespan=lifespan,
 )
 
 # Register Middleware here when Needed
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+
+# Register Exception Handlers here
+app.add_exception_handler(IdempotentReplay, replay_idempotent_response)
 
 
 # Add Routers Here
 BASE_DIR = Path(__file__).resolve().parent.parent
 static_dir = Path(BASE_DIR, "static")
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+# Resized variants of item and category images, served from a disk cache
+app.include_router(image_router, prefix="/images", tags=["Images"])
 
 app.include_router(
     auth_router,
@@ -64,3 +92,8 @@ app.include_router(
     prefix=f"/{ROOT_ROUTE}/{APP_VERSION}/orders",
     tags=["Orders and Payment"],
 )
+app.include_router(
+    metrics_router,
+    prefix=f"/{ROOT_ROUTE}/{APP_VERSION}/metrics",
+    tags=["Metrics"],
+)
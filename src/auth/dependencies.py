@@ -1,29 +1,15 @@
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi import HTTPException, status, Depends, Request, UploadFile, File
+from fastapi import HTTPException, status, Depends, Request
 from typing import Optional, Dict
-import cloudinary
-import cloudinary.uploader
-import os
-import shutil
-import tempfile
 from src.auth.utils import decode_token
 from src.db.redis import token_in_blacklist
-from src.db.main import get_session
+from src.db.main import get_unit_of_work
 from src.db.models import User
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.service import AuthService
 from src.db.Types import User_Roles
 from src.config import settings
 
-cloudinary.config(
-    cloud_name=settings.CLOUDINARY_NAME,
-    api_key=settings.CLOUDINARY_API_KEY,
-    api_secret=settings.CLOUDINARY_SECRET,
-    secure=True,
-)
-# print("CLOUD NAME: ", settings.CLOUDINARY_NAME)
-
-
 auth_service = AuthService()
 
 
@@ -85,7 +71,7 @@ class RefreshTokenBearer(TokenBearer):
 
 async def get_current_user(
     token_details: dict = Depends(AccessTokenBearer()),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     user_email = token_details["user"]["email"]
     if not user_email:
@@ -104,7 +90,7 @@ async def get_current_user(
 
 async def get_current_customer(
     token_details: dict = Depends(AccessTokenBearer()),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     user_id = token_details["user"]["user_id"]
     if not user_id:
@@ -126,56 +112,6 @@ async def get_current_customer(
     return customer_details
 
 
-def save_temp_image(image_file: UploadFile = File(...)) -> str:
-    allowed_types = {"image/jpeg", "image/png", "image/gif"}
-    if image_file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only JPEG, PNG, and GIF images are allowed",
-        )
-    temp_dir = tempfile.gettempdir()
-    temp_path = f"{temp_dir}/{image_file.filename}"
-
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(image_file.file, buffer)
-
-    return temp_path
-
-
-async def uploadCloudinary(localPath: str):
-    try:
-        if not localPath:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="The Local Path of the file is unavailable.",
-            )
-
-        if not os.path.exists(localPath):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Temporary file path is not available or incorrect.",
-            )
-
-        cloudinary_result = cloudinary.uploader.upload(
-            localPath,
-        )
-
-        if os.path.exists(localPath):
-            os.remove(localPath)
-
-        return cloudinary_result
-
-    except Exception as e:
-        # ✅ Ensure file is deleted only if it exists
-        if os.path.exists(localPath):
-            os.remove(localPath)
-
-        # ✅ Log or handle the error properly
-        print(f"Error uploading to Cloudinary: {e}")
-
-        return None
-
-
 class RoleChecker:
     def __init__(self, allowed_roles: list[str]):
         self.allowed_roles = allowed_roles
@@ -183,13 +119,12 @@ class RoleChecker:
     async def __call__(
         self,
         user: User = Depends(get_current_user),
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_unit_of_work),
     ):
         if user.role == User_Roles.CUSTOMER:
-            customer_details = await auth_service.get_customer(
-                user_id=user.uid, session=session
-            )
-            if not customer_details.is_verified:
+            # Customer row is already loaded by the auth_principal profile
+            customer_details = user.customer
+            if customer_details is None or not customer_details.is_verified:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Customer not verified. Please verify your account and try again",
@@ -3,7 +3,7 @@ from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import EmailStr
 from datetime import datetime
-from src.db.main import get_session
+from src.db.main import get_unit_of_work
 from src.db.redis import add_token_to_blacklist
 from src.auth.dependencies import (
     AccessTokenBearer,
@@ -14,7 +14,7 @@ from src.auth.dependencies import (
 from src.auth.service import AuthService
 from .utils import (
     generate_password_hash,
-    verify_password,
+    verify_and_update_password,
     create_token,
     convert_str,
     templates,
@@ -74,7 +74,7 @@ async def send_background_email(
 
 @auth_router.get("/login")
 async def user_logger(
-    login_details: LoginSchema, session: AsyncSession = Depends(get_session)
+    login_details: LoginSchema, session: AsyncSession = Depends(get_unit_of_work)
 ):
     # Verify Email and password and create a new Access and Refresh Token
     user = await auth_service.get_user(login_details.email, session)
@@ -83,11 +83,17 @@ async def user_logger(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with email {str(login_details.email)} is not present in the database",
         )
-    if not verify_password(login_details.password, user.password_hash):
+    is_valid_password, new_password_hash = await verify_and_update_password(
+        login_details.password, user.password_hash
+    )
+    if not is_valid_password:
         raise HTTPException(
             status_code=status.HTTP_406_NOT_ACCEPTABLE,
             detail="Passsword didn't matched. Please Check the password and Try Again",
         )
+    # The stored hash used an outdated cost, replace it while we have the password
+    if new_password_hash is not None:
+        await auth_service.rehash_password(user, new_password_hash, session)
 
     token_payload = {
         "email": login_details.email,
@@ -111,7 +117,7 @@ async def user_logger(
 @auth_router.get("/logout")
 async def logout_user(
     token_data=Depends(AccessTokenBearer()),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         await add_token_to_blacklist(token_data["jti"])
@@ -128,7 +134,7 @@ async def logout_user(
 
 @auth_router.get("/verify/{safe_token}")
 async def verify_user_account(
-    safe_token: str, session: AsyncSession = Depends(get_session)
+    safe_token: str, session: AsyncSession = Depends(get_unit_of_work)
 ):
     token_data = decode_safe_token(safe_token)
     if not token_data:
@@ -161,7 +167,7 @@ async def verify_user_account(
 
 @auth_router.get("/generate_access_token")
 async def generate_access_token(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
     token_data=Depends(RefreshTokenBearer()),
 ):
     expiry_timestamp = token_data["expiry"]
@@ -185,7 +191,7 @@ async def generate_access_token(
 async def create_new_customer(
     user_input: UserSchema,
     background_task: BackgroundTasks,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         await auth_service.create_user(user_input, session)
@@ -236,7 +242,7 @@ async def create_new_customer(
 async def send_password_reset(
     email_details: PasswordResetSchema,
     background_task: BackgroundTasks,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         if not email_details.email_id:
@@ -283,7 +289,7 @@ async def update_user(
     user_id: str,
     updated_info: UserUpdateSchema,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     # Fetch User to be Updated
     user_tobe_updated = await auth_service.get_user_by_uid(user_id, session)
@@ -330,7 +336,7 @@ async def update_role(
     user_id: str,
     updated_role: UserRoleUpdate,
     user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         user_to_be_updated = await auth_service.get_user_by_uid(user_id, session)
@@ -363,7 +369,7 @@ async def update_role(
 async def set_new_password(
     password_safe_token: str,
     new_password_details: PasswordConfirmSchema,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         email_info = decode_safe_token(password_safe_token)
@@ -398,7 +404,7 @@ async def set_new_password(
 @auth_router.get("/my_info")
 async def get_user_info(
     token_details: dict = Depends(AccessTokenBearer()),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     print("Token Details:", token_details)
     user_email = token_details.get("user").get("email")
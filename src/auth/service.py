@@ -9,6 +9,7 @@ import uuid
 from src.db.models import Customer, User
 from .schema import UserSchema, PasswordConfirmSchema, UserUpdateSchema, UserRoleUpdate
 from src.auth.utils import generate_password_hash
+from src.db.loaders import loader_profile
 
 
 class AuthService:
@@ -20,7 +21,11 @@ class AuthService:
                     detail="Please provide email and try again",
                 )
 
-            statement = select(User).where(User.email == email)
+            statement = (
+                select(User)
+                .where(User.email == email)
+                .options(*loader_profile("auth_principal"))
+            )
             result = await session.exec(statement)
             user = result.first()
             return user
@@ -39,7 +44,11 @@ class AuthService:
                     detail="Please provide user id and try again",
                 )
 
-            statement = select(User).where(User.uid == user_id)
+            statement = (
+                select(User)
+                .where(User.uid == user_id)
+                .options(*loader_profile("auth_principal"))
+            )
             result = await session.exec(statement)
             user = result.one()
             return user
@@ -103,13 +112,14 @@ class AuthService:
             password_val = user_details_dict.pop("password", None)
             new_user = User(**user_details_dict)
             if password_val:
-                new_user.password_hash = generate_password_hash(password_val)
+                new_user.password_hash = await generate_password_hash(password_val)
             session.add(new_user)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_user)
             return new_user
+        except HTTPException as e:
+            raise e
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error Creating New User: {str(e)}",
@@ -125,11 +135,10 @@ class AuthService:
                 )
             new_customer = Customer(user_id=user_data.uid, is_verified=False)
             session.add(new_customer)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_customer)
             return new_customer
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error Creating New Customer: {str(e)}",
@@ -147,11 +156,10 @@ class AuthService:
             #     )
             new_customer = Customer(user_id=user_id, is_verified=False)
             session.add(new_customer)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_customer)
             return new_customer
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error Creating New Customer: {str(e)}",
@@ -180,7 +188,7 @@ class AuthService:
                 else:
                     raise ValueError(f"Invalid Key Attribute : {key}")
 
-            await session.commit()
+            await session.flush()
             await session.refresh(user)
 
             return user
@@ -213,11 +221,10 @@ class AuthService:
         user.role = new_role
 
         try:
-            await session.commit()
+            await session.flush()
             await session.refresh(user)
             return user
         except Exception as e:
-            await session.rollback()  # Ensure rollback on failure
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error updating user role: {str(e)}",
@@ -239,7 +246,7 @@ class AuthService:
                 else:
                     raise ValueError(f"Invalid Key Attribute : {key}")
 
-            await session.commit()
+            await session.flush()
             await session.refresh(customer)
 
             return JSONResponse(
@@ -254,6 +261,20 @@ class AuthService:
                 detail=f"Error Updating Customer Info: {str(e)}",
             )
 
+    async def rehash_password(
+        self, user: User, password_hash: str, session: AsyncSession
+    ):
+        try:
+            user.password_hash = password_hash
+            session.add(user)
+            await session.flush()
+            return user
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error updating password hash: {str(e)}",
+            )
+
     async def update_password(
         self,
         user: User,
@@ -267,15 +288,16 @@ class AuthService:
                     detail="Password and confirm password do not match.",
                 )
 
-            user.password_hash = generate_password_hash(
+            user.password_hash = await generate_password_hash(
                 new_password_schema.new_password
             )
             session.add(user)
-            await session.commit()
+            await session.flush()
             await session.refresh(user)
             return user
+        except HTTPException as e:
+            raise e
         except Exception as e:
-            await session.rollback()  # Rollback in case of error
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error updating password: {str(e)}",
@@ -1,25 +1,165 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException, status
 from fastapi.templating import Jinja2Templates
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired
 from pathlib import Path
+from typing import Optional
+import asyncio
+import math
+import time
 import uuid
 import jwt
 import logging
 from src.config import settings
+from src.db.redis import client
 
 from decimal import Decimal
 
 
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+# Calibration never goes below passlib's own default
+PASSWORD_HASH_MIN_ROUNDS = 12
+PASSWORD_HASH_MAX_ROUNDS = 16
+PASSWORD_HASH_ROUNDS_KEY = "password_hash:rounds:{target_ms}"
+CALIBRATION_PASSWORD = "bcrypt-calibration"
+
+
+class PasswordHashPool:
+    """Runs bcrypt on a bounded thread pool instead of the event loop.
+
+    bcrypt releases the GIL while hashing, so threads hash in parallel. Calls
+    beyond the workers plus PASSWORD_HASH_MAX_QUEUE are refused with a 503
+    straight away instead of queueing behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_in_flight = workers + max_queue
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+
+    async def run(self, function, *args):
+        # Counters only change on the event loop thread, no lock needed
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password checks in progress. Please try again shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+            )
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hash_pool = PasswordHashPool(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+
+async def generate_password_hash(password: str) -> str:
+    return await password_hash_pool.run(password_context.hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await password_hash_pool.run(
+        password_context.verify, password, password_hash
+    )
+
+
+# Returns the new hash when the stored one was made with outdated settings
+async def verify_and_update_password(
+    password: str, password_hash: str
+) -> tuple[bool, Optional[str]]:
+    return await password_hash_pool.run(
+        password_context.verify_and_update, password, password_hash
+    )
 
 
-def generate_password_hash(password: str) -> str:
-    return password_context.hash(password)
+def _measure_bcrypt_ms(rounds: int) -> float:
+    bcrypt_handler = password_context.handler("bcrypt").using(rounds=rounds)
+    started_at = time.perf_counter()
+    bcrypt_handler.hash(CALIBRATION_PASSWORD)
+    return (time.perf_counter() - started_at) * 1000
 
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return password_context.verify(password, password_hash)
+def _calibrate_rounds(target_ms: int) -> int:
+    # Best of two runs, then every extra round doubles the cost
+    elapsed_ms = min(_measure_bcrypt_ms(PASSWORD_HASH_MIN_ROUNDS) for _ in range(2))
+    extra_rounds = math.floor(math.log2(target_ms / elapsed_ms)) if elapsed_ms else 0
+    return max(
+        PASSWORD_HASH_MIN_ROUNDS,
+        min(PASSWORD_HASH_MAX_ROUNDS, PASSWORD_HASH_MIN_ROUNDS + extra_rounds),
+    )
+
+
+# The first worker to calibrate stores its pick, every other worker reuses it.
+# The pick is kept per target and expires, so new targets and hardware recalibrate.
+async def _shared_calibrated_rounds() -> int:
+    target_ms = settings.PASSWORD_HASH_TARGET_MS
+    rounds_key = PASSWORD_HASH_ROUNDS_KEY.format(target_ms=target_ms)
+    stored_rounds = await client.get(rounds_key)
+    if stored_rounds is None:
+        rounds = await password_hash_pool.run(_calibrate_rounds, target_ms)
+        await client.set(
+            rounds_key,
+            rounds,
+            nx=True,
+            ex=settings.PASSWORD_HASH_CALIBRATION_TTL_SECONDS,
+        )
+        stored_rounds = await client.get(rounds_key)
+    return int(stored_rounds)
+
+
+async def calibrate_password_hashing() -> int:
+    if settings.PASSWORD_HASH_ROUNDS:
+        # Only an explicit setting may take the cost below the calibration floor
+        rounds = settings.PASSWORD_HASH_ROUNDS
+        min_rounds, max_rounds = rounds, rounds + 1
+    else:
+        try:
+            rounds = await _shared_calibrated_rounds()
+            min_rounds, max_rounds = rounds, rounds + 1
+        except Exception:
+            # Workers may now pick different costs, so none rehashes another's hashes
+            logging.exception("Could not share the bcrypt cost, calibrating locally")
+            rounds = await password_hash_pool.run(
+                _calibrate_rounds, settings.PASSWORD_HASH_TARGET_MS
+            )
+            min_rounds, max_rounds = PASSWORD_HASH_MIN_ROUNDS, PASSWORD_HASH_MAX_ROUNDS
+    # Hashes outside [min_rounds, max_rounds] are rehashed on the next login
+    password_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=min_rounds,
+        bcrypt__max_rounds=max_rounds,
+    )
+    logging.info("Password hashing uses %s bcrypt rounds", rounds)
+    return rounds
 
 
 def create_token(user_data: dict, isRefreshToken: bool = False):
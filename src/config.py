@@ -1,14 +1,37 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_REPLICA_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: int = 10
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
+    DB_QUERY_BUDGET_STRICT: bool = False
     APP_VERSION: str
     ROOT_ROUTE: str
     JWT_SECRET: str
     JWT_ALGORITHM: str
     REDIS_URI: str
     REDIS_TOKEN: str
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 10
+    MENU_CACHE_VERSION_TTL: float = 1.0
+    MENU_CACHE_MAX_ENTRIES: int = 2048
+    SEARCH_CACHE_MAX_ENTRIES: int = 256
+    ETAG_VERSION_TTL_SECONDS: int = 604800
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_TARGET_MS: int = 250
+    PASSWORD_HASH_CALIBRATION_TTL_SECONDS: int = 86400
+    PASSWORD_HASH_ROUNDS: Optional[int] = None
     MAIL_USERNAME: str = "System Generated"
     MAIL_PASSWORD: str
     MAIL_FROM: str
@@ -25,6 +48,16 @@ class Settings(BaseSettings):
     CLOUDINARY_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_SECRET: str
+    IMAGE_STORAGE_BACKEND: str = "cloudinary"
+    LOCAL_IMAGE_DIR: str = "static/uploads"
+    LOCAL_IMAGE_URL: str = "/static/uploads"
+    IMAGE_UPLOAD_CONCURRENCY: int = 4
+    IMAGE_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    IMAGE_SOURCE_MAX_BYTES: int = 20 * 1024 * 1024
+    IMAGE_PROXY_ALLOWED_HOSTS: list[str] = ["res.cloudinary.com"]
+    IMAGE_CACHE_DIR: str = "cache/images"
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    IMAGE_RENDER_CONCURRENCY: int = 4
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -0,0 +1,78 @@
+from fastapi import Request, status
+from fastapi.responses import Response
+from typing import Optional
+import hashlib
+import logging
+import time
+
+from src.db.redis import client
+from src.config import settings
+
+ETAG_CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = [
+        candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")
+    ]
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL},
+    )
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+    return response
+
+
+# Per resource versions live in Redis so revalidation never needs Postgres.
+# A missing key starts at the current time in milliseconds, so a key that expired
+# and was created again never hands out a version an old client may still hold.
+async def get_resource_version(key: str) -> Optional[str]:
+    version_key = f"etag:{key}"
+    try:
+        version = await client.get(version_key)
+        if version is None:
+            await client.set(
+                version_key,
+                int(time.time() * 1000),
+                nx=True,
+                ex=settings.ETAG_VERSION_TTL_SECONDS,
+            )
+            version = await client.get(version_key)
+    except Exception:
+        logging.exception("Could not read the version of %s", key)
+        return None
+    return version.decode() if version is not None else None
+
+
+async def bump_resource_version(key: str):
+    version_key = f"etag:{key}"
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.set(
+            version_key,
+            int(time.time() * 1000),
+            nx=True,
+            ex=settings.ETAG_VERSION_TTL_SECONDS,
+        )
+        pipe.incr(version_key)
+        pipe.expire(version_key, settings.ETAG_VERSION_TTL_SECONDS)
+        await pipe.execute()
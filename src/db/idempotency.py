@@ -0,0 +1,154 @@
+from fastapi import Header, HTTPException, Request, status
+from fastapi.responses import Response
+from typing import Optional
+import asyncio
+import hashlib
+import json
+import uuid
+
+from src.db.redis import client
+from src.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_POLL_SECONDS = 0.1
+
+# Reading the stored response and taking the lock happen in one step, so a
+# duplicate can never slip in between the first request's store and unlock
+CLAIM_SCRIPT = client.register_script(
+    """
+    local stored_response = redis.call('GET', KEYS[1])
+    if stored_response then
+        return {'stored', stored_response}
+    end
+    if redis.call('SET', KEYS[2], ARGV[1], 'NX', 'EX', ARGV[2]) then
+        return {'locked', ''}
+    end
+    return {'busy', ''}
+    """
+)
+
+# Only the request holding the lock may release it, an expired lock can be taken over
+RELEASE_SCRIPT = client.register_script(
+    """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+class IdempotentReplay(Exception):
+    def __init__(self, response: Response):
+        self.response = response
+
+
+async def replay_idempotent_response(request: Request, exc: IdempotentReplay):
+    return exc.response
+
+
+class IdempotencyRecord:
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.response: Optional[Response] = None
+
+    def save(self, response: Response) -> Response:
+        self.response = response
+        return response
+
+
+def _storage_key(request: Request, idempotency_key: str) -> str:
+    # Keys are scoped to the caller's token and the route so clients cannot replay each other
+    scope = "|".join(
+        [
+            request.headers.get("authorization", ""),
+            request.method,
+            request.url.path,
+            idempotency_key,
+        ]
+    )
+    return f"idempotency:{hashlib.sha256(scope.encode()).hexdigest()}"
+
+
+async def _wait_for_response(storage_key: str):
+    waited = 0.0
+    while waited < settings.IDEMPOTENCY_LOCK_SECONDS:
+        await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+        waited += IDEMPOTENCY_POLL_SECONDS
+        stored_response = await client.get(storage_key)
+        if stored_response is not None:
+            return stored_response
+        if not await client.exists(f"{storage_key}:lock"):
+            return None
+    return None
+
+
+# Declare before any dependency that touches Postgres so replays never reach the database
+async def get_idempotency_record(
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
+):
+    if not idempotency_key:
+        yield IdempotencyRecord()
+        return
+    if len(idempotency_key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be at most 255 characters",
+        )
+
+    fingerprint = hashlib.sha256(await request.body()).hexdigest()
+    storage_key = _storage_key(request, idempotency_key)
+    lock_key = f"{storage_key}:lock"
+    lock_token = uuid.uuid4().hex
+
+    claim, stored_response = await CLAIM_SCRIPT(
+        keys=[storage_key, lock_key],
+        args=[lock_token, settings.IDEMPOTENCY_LOCK_SECONDS],
+    )
+    if claim == b"locked":
+        stored_response = None
+    elif claim == b"busy":
+        # A concurrent duplicate is running, wait for its response
+        stored_response = await _wait_for_response(storage_key)
+        if stored_response is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+            )
+
+    if stored_response is not None:
+        stored_record = json.loads(stored_response)
+        if stored_record["fingerprint"] != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request body",
+            )
+        raise IdempotentReplay(
+            Response(
+                content=stored_record["body"],
+                status_code=stored_record["status_code"],
+                media_type=stored_record["media_type"],
+                headers={"Idempotent-Replayed": "true"},
+            )
+        )
+
+    record = IdempotencyRecord(idempotency_key)
+    try:
+        yield record
+        # Runs after the request's unit of work has committed
+        if record.response is not None and record.response.status_code < 500:
+            await client.set(
+                storage_key,
+                json.dumps(
+                    {
+                        "fingerprint": fingerprint,
+                        "status_code": record.response.status_code,
+                        "media_type": record.response.media_type,
+                        "body": record.response.body.decode(),
+                    }
+                ),
+                ex=settings.IDEMPOTENCY_TTL_SECONDS,
+            )
+    finally:
+        await RELEASE_SCRIPT(keys=[lock_key], args=[lock_token])
@@ -0,0 +1,137 @@
+from contextvars import ContextVar
+from contextlib import contextmanager
+from collections import Counter
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Optional
+import json
+import logging
+import time
+
+from src.config import settings
+
+query_logger = logging.getLogger("src.db.queries")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.statements = Counter()
+
+    def record(self, statement: str, elapsed: float, rows: int):
+        self.query_count += 1
+        self.db_time += elapsed
+        self.rows += rows
+        self.statements[statement] += 1
+
+    def repeated_statements(self, threshold: int) -> list[dict]:
+        # Same SQL text run many times with different parameters is the N+1 pattern
+        return [
+            {"statement": " ".join(statement.split())[:200], "count": count}
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def as_dict(self) -> dict:
+        return {
+            "queries": self.query_count,
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def instrument_engine(engine: AsyncEngine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_time = conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        stats.record(statement, time.perf_counter() - start_time, rows)
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    # For tests that call services directly: with assert_max_queries(3): ...
+    with track_queries() as stats:
+        yield stats
+    if stats.query_count > max_queries:
+        raise QueryBudgetExceeded(
+            f"Expected at most {max_queries} queries but {stats.query_count} were issued"
+        )
+
+
+class QueryBudget:
+    # Route level budget: dependencies=[Depends(QueryBudget(3))]
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+
+    async def __call__(self, request: Request):
+        request.state.query_budget = self.max_queries
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        with track_queries() as stats:
+            response = await call_next(request)
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.query_count} queries"'
+        )
+        response.headers["X-DB-Query-Count"] = str(stats.query_count)
+
+        repeated = stats.repeated_statements(settings.DB_N_PLUS_ONE_THRESHOLD)
+        log_line = {
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            **stats.as_dict(),
+        }
+        if repeated:
+            log_line["n_plus_one"] = repeated
+            query_logger.warning(json.dumps(log_line))
+        else:
+            query_logger.info(json.dumps(log_line))
+
+        query_budget = getattr(request.state, "query_budget", None)
+        if query_budget is not None and stats.query_count > query_budget:
+            message = (
+                f"{request.method} {request.url.path} issued {stats.query_count} "
+                f"queries, budget is {query_budget}"
+            )
+            if settings.DB_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            query_logger.warning(message)
+        return response
@@ -0,0 +1,25 @@
+from sqlalchemy.orm import selectinload, joinedload
+from src.db.models import User, Order, Item
+
+# Relationships default to raise_on_sql. Each query opts into the profile it needs.
+LOADER_PROFILES = {
+    # Current user plus the customer row used by the role and verification checks
+    "auth_principal": (joinedload(User.customer),),
+    # Single order with its line items
+    "order_detail": (selectinload(Order.order_items),),
+    # Order rows only, for lists and status updates
+    "order_listing": (),
+    # Item rows only, for menu lists and price lookups
+    "menu_listing": (),
+    # Single item with the categories it belongs to
+    "item_detail": (selectinload(Item.categories),),
+    "category_detail": (),
+    "address_listing": (),
+}
+
+
+def loader_profile(name: str) -> tuple:
+    try:
+        return LOADER_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown loader profile : {str(name)}")
@@ -1,38 +1,144 @@
-from sqlmodel import create_engine, SQLModel, text
+from sqlmodel import text
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
 import logging
 
 from src.config import settings
+from src.db.pool import InstrumentedQueuePool
+from src.db.replica import is_pinned_to_primary
+from src.db.instrumentation import instrument_engine
 
-# Create new Engine
-engine = AsyncEngine(
-    create_engine(
-        url=settings.DATABASE_URL,
-        echo=True
+
+def build_engine(url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
     )
+    pool = new_engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool.stats.record_connect()
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool.stats.record_invalidate()
+
+    instrument_engine(new_engine)
+    return new_engine
+
+
+# Create new Engine
+engine = build_engine(settings.DATABASE_URL)
+
+# Optional read replica. Without one, reads go to the primary engine.
+replica_engine = (
+    build_engine(settings.DATABASE_REPLICA_URL)
+    if settings.DATABASE_REPLICA_URL
+    else engine
 )
 
+
+def get_pool_status() -> dict:
+    pool_status = {"primary": engine.sync_engine.pool.status_dict()}
+    if replica_engine is not engine:
+        pool_status["replica"] = replica_engine.sync_engine.pool.status_dict()
+    return pool_status
+
+
 # Intialize the engine
 
+# Only checks the connection, the schema is owned by `alembic upgrade head`
 async def init_db():
-    async with engine.begin() as conn:
+    async with engine.connect() as conn:
         try:
-            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.execute(text("SELECT 1"))
         except Exception as e:
             logging.error(f"Database Initialization Failed: {e}")
             raise e
 
 
-# Define New Session Maker
+async def close_db():
+    await engine.dispose()
+    if replica_engine is not engine:
+        await replica_engine.dispose()
+
+
+# Session factory is built once and shared by every request
+async_session_factory = sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+replica_session_factory = sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 async def get_session():
-    Session= sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=True
-    )
+    async with async_session_factory() as session:
+        yield session
+
+
+# Queue an async callback that runs only after the request's unit of work commits
+def on_commit(session: AsyncSession, callback):
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session: AsyncSession):
+    for callback in session.info.pop("after_commit", []):
+        try:
+            await callback()
+        except Exception:
+            logging.exception("After commit callback failed")
+
+
+# Queue an async callback that runs only if the request's unit of work rolls back
+def on_rollback(session: AsyncSession, callback):
+    session.info.setdefault("after_rollback", []).append(callback)
+
+
+async def run_after_rollback(session: AsyncSession):
+    for callback in session.info.pop("after_rollback", []):
+        try:
+            await callback()
+        except Exception:
+            logging.exception("After rollback callback failed")
+
+
+# Request scoped unit of work. Services only flush, the request commits once.
+async def get_unit_of_work():
+    async with async_session_factory() as session:
+        try:
+            yield session
+            if session.in_transaction():
+                await session.commit()
+        except Exception:
+            session.info.pop("after_commit", None)
+            await session.rollback()
+            await run_after_rollback(session)
+            raise
+        session.info.pop("after_rollback", None)
+        await run_after_commit(session)
+
 
-    async with Session() as session:
-        yield session
\ No newline at end of file
+# Read only session for GET routes. Goes to the replica unless the client wrote recently.
+async def get_read_session(request: Request):
+    use_primary = replica_engine is engine or is_pinned_to_primary(request)
+    request.state.db_route = "primary" if use_primary else "replica"
+    session_factory = async_session_factory if use_primary else replica_session_factory
+    async with session_factory() as session:
+        yield session
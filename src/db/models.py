@@ -1,7 +1,7 @@
 from sqlmodel import Field, SQLModel, Column, Relationship
 import sqlalchemy.dialects.postgresql as pg
 from sqlalchemy.schema import ForeignKey
-from sqlalchemy import UniqueConstraint, func
+from sqlalchemy import UniqueConstraint, Index, Computed, func, text
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, List
@@ -20,6 +20,8 @@ from src.db.Types import (
     Staff_Roles,
 )
 
+DEFAULT_IMAGE_URL = "https://cksc.com.au/CKSC/media/Images/no-product-image-400x400.png"
+
 
 class Item_Category(SQLModel, table=True):
     __tablename__ = "itemCategories"
@@ -35,6 +37,8 @@ class Item_Category(SQLModel, table=True):
     )
     __table_args__ = (
         UniqueConstraint("item_id", "category_id", name="uq_item_category"),
+        # The primary key leads with item_id, category listings need the reverse
+        Index("ix_itemCategories_category_id_item_id", "category_id", "item_id"),
     )
 
 
@@ -58,9 +62,12 @@ class Order_Items(SQLModel, table=True):
         sa_column=Column(pg.NUMERIC(10, 2), nullable=False)
     )
     order: Optional["Order"] = Relationship(
-        back_populates="order_items", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="order_items", sa_relationship_kwargs={"lazy": "raise_on_sql"}
+    )
+    item: Optional["Item"] = Relationship(
+        sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
-    item: Optional["Item"] = Relationship()
+    __table_args__ = (Index("ix_orderItems_order_id", "order_id"),)
 
 
 class Order(SQLModel, table=True):
@@ -85,10 +92,10 @@ class Order(SQLModel, table=True):
         sa_column=Column(pg.UUID, ForeignKey("delivery_addresses.uid"), nullable=True)
     )
     customer: Optional["Customer"] = Relationship(
-        back_populates="orders", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="orders", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     order_items: List["Order_Items"] = Relationship(
-        back_populates="order", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="order", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     created_at: datetime = Field(
         sa_column=Column(
@@ -104,6 +111,24 @@ class Order(SQLModel, table=True):
         )
     )
 
+    __table_args__ = (
+        Index(
+            "ix_orders_customer_id_status_created_at",
+            "customer_id",
+            "order_status",
+            "created_at",
+        ),
+        # Kitchen queue only scans orders that are still in progress
+        Index(
+            "ix_orders_active_created_at",
+            "created_at",
+            "uid",
+            postgresql_where=text(
+                "order_status <> 'CANCELLED'::orderstatus AND order_status <> 'DELIVERED'::orderstatus"
+            ),
+        ),
+    )
+
     def __repr__(self):
         return f"<Order for Customer Id: {self.customer_id} with Order Id: {self.uid}"
 
@@ -131,10 +156,10 @@ class User(SQLModel, table=True):
         )
     )
     customer: Optional["Customer"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     staff: Optional["Staff"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     created_at: datetime = Field(
         sa_column=Column(
@@ -171,13 +196,13 @@ class Customer(SQLModel, table=True):
         sa_column=Column(pg.BOOLEAN, nullable=False, default=False)
     )
     user: User = Relationship(
-        back_populates="customer", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="customer", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     addresses: List["Delivery_Address"] = Relationship(
-        back_populates="customer", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="customer", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     orders: List[Order] = Relationship(
-        back_populates="customer", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="customer", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
 
     def __repr__(self):
@@ -200,7 +225,10 @@ class Delivery_Address(SQLModel, table=True):
     )
     city: str = Field(sa_column=Column(pg.VARCHAR(100), nullable=True))
     postal_code: str = Field(sa_column=Column(pg.VARCHAR(100), nullable=True))
-    customer: Optional[Customer] = Relationship(back_populates="addresses")
+    customer: Optional[Customer] = Relationship(
+        back_populates="addresses", sa_relationship_kwargs={"lazy": "raise_on_sql"}
+    )
+    __table_args__ = (Index("ix_delivery_addresses_customer_id", "customer_id"),)
 
     def __repr__(self):
         return f"<Delivery_Address of Customer {self.customer_id}>"
@@ -233,7 +261,7 @@ class Staff(SQLModel, table=True):
         sa_column=Column(pg.NUMERIC(10, 2), nullable=False, default=0.00)
     )
     user: User = Relationship(
-        back_populates="staff", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="staff", sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
 
     def __repr__(self):
@@ -260,23 +288,43 @@ class Item(SQLModel, table=True):
         sa_column=Column(
             pg.VARCHAR(250),
             nullable=False,
-            default="https://cksc.com.au/CKSC/media/Images/no-product-image-400x400.png",
+            default=DEFAULT_IMAGE_URL,
         )
     )
     categories: list["Category"] = Relationship(
         back_populates="items",
         link_model=Item_Category,
-        sa_relationship_kwargs={"lazy": "selectin"},
+        # The link rows cascade in Postgres, deletes never load them
+        sa_relationship_kwargs={"lazy": "raise_on_sql", "passive_deletes": True},
     )
 
     # __table_args__=(
     #     UniqueConstraint("name", "sku", name="Unique_name_sku")
     # )
+    __table_args__ = (Index("ix_items_name_uid", "name", "uid"),)
 
     def __repr__(self):
         return f"<Item {self.name} with SKU {self.sku}>"
 
 
+# Full text search column generated by Postgres. It lives on the table but not on the
+# model, so item payloads never carry it. Queries use Item.__table__.c.search_vector.
+ITEM_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+Item.__table__.append_column(
+    Column("search_vector", pg.TSVECTOR, Computed(ITEM_SEARCH_VECTOR_SQL))
+)
+Index("ix_items_search_vector", Item.__table__.c.search_vector, postgresql_using="gin")
+Index(
+    "ix_items_name_trgm",
+    func.lower(Item.__table__.c.name).label("lower_name"),
+    postgresql_using="gin",
+    postgresql_ops={"lower_name": "gin_trgm_ops"},
+)
+
+
 class Category(SQLModel, table=True):
     __tablename__ = "categories"
     uid: uuid.UUID = Field(
@@ -291,19 +339,46 @@ class Category(SQLModel, table=True):
         sa_column=Column(
             pg.VARCHAR(250),
             nullable=False,
-            default="https://cksc.com.au/CKSC/media/Images/no-product-image-400x400.png",
+            default=DEFAULT_IMAGE_URL,
         )
     )
     items: list["Item"] = Relationship(
         back_populates="categories",
         link_model=Item_Category,
-        sa_relationship_kwargs={"lazy": "selectin"},
+        # The link rows cascade in Postgres, deletes never load them
+        sa_relationship_kwargs={"lazy": "raise_on_sql", "passive_deletes": True},
     )
 
     def __repr__(self):
         return f"<Food Category {self.name} of Dish {self.type_of}>"
 
 
+# Token of the newest image upload per row, kept off the models like search_vector.
+# An upload only swaps the image in while its token is still the current one.
+Item.__table__.append_column(Column("image_upload_token", pg.UUID))
+Category.__table__.append_column(Column("image_upload_token", pg.UUID))
+
+
+# Append only log of catalog writes, read by the menu delta sync
+class Catalog_Change(SQLModel, table=True):
+    __tablename__ = "catalog_changes"
+    version: Optional[int] = Field(
+        default=None,
+        sa_column=Column(pg.BIGINT, primary_key=True, autoincrement=True),
+    )
+    entity: str = Field(sa_column=Column(pg.VARCHAR(20), nullable=False))
+    entity_id: uuid.UUID = Field(sa_column=Column(pg.UUID, nullable=False))
+    op: str = Field(sa_column=Column(pg.VARCHAR(10), nullable=False))
+    changed_at: datetime = Field(
+        sa_column=Column(
+            pg.TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+        )
+    )
+
+    def __repr__(self):
+        return f"<Catalog Change {self.version}: {self.op} {self.entity} {self.entity_id}>"
+
+
 class Payment(SQLModel, table=True):
     __tablename__ = "payments"
     uid: uuid.UUID = Field(
@@ -339,6 +414,8 @@ class Payment(SQLModel, table=True):
         )
     )
 
+    __table_args__ = (Index("ix_payments_order_id", "order_id"),)
+
     def __repr__(self):
         return f"<Payment {self.transaction_id} of Order {self.order_id}>"
 
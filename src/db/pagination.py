@@ -0,0 +1,76 @@
+from fastapi import HTTPException, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import tuple_
+from datetime import datetime
+from typing import Optional
+import base64
+import binascii
+import json
+import uuid
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values: list) -> str:
+    raw_cursor = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else str(value)
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    try:
+        padded_cursor = cursor + "=" * (-len(cursor) % 4)
+        raw_values = json.loads(base64.urlsafe_b64decode(padded_cursor.encode()))
+        if not isinstance(raw_values, list) or len(raw_values) != len(columns):
+            raise ValueError("Cursor does not match the sort keys")
+        return [
+            _coerce_value(column, raw_value)
+            for column, raw_value in zip(columns, raw_values)
+        ]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor. Please start again without a cursor",
+        )
+
+
+def _coerce_value(column, raw_value: str):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(raw_value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(raw_value)
+    return python_type(raw_value)
+
+
+# Keyset pagination: the sort keys must end with a unique column (uid) so the order is total
+async def paginate(
+    session: AsyncSession,
+    statement,
+    order_by: list,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+):
+    if cursor:
+        last_values = tuple(decode_cursor(cursor, order_by))
+        sort_key = tuple_(*order_by)
+        statement = statement.where(
+            sort_key < last_values if descending else sort_key > last_values
+        )
+    statement = statement.order_by(
+        *[column.desc() if descending else column.asc() for column in order_by]
+    ).limit(limit + 1)
+
+    rows = (await session.exec(statement)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in order_by])
+    return rows, next_cursor
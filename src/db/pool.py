@@ -0,0 +1,90 @@
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from threading import Lock
+import time
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_timeouts = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.overflow_checkouts = 0
+            self.connections_created = 0
+            self.connections_invalidated = 0
+
+    def record_checkout(self, wait_seconds: float, overflow: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            if overflow:
+                self.overflow_checkouts += 1
+
+    def record_timeout(self, wait_seconds: float):
+        with self._lock:
+            self.checkout_timeouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connections_created += 1
+
+    def record_invalidate(self):
+        with self._lock:
+            self.connections_invalidated += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg_wait = self.total_wait_seconds / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "connections_created": self.connections_created,
+                "connections_invalidated": self.connections_invalidated,
+            }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a slot."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        overflow_before = self.overflow()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+        # Only checkouts that opened a connection beyond pool_size count as overflow
+        overflow_after = self.overflow()
+        self.stats.record_checkout(
+            time.perf_counter() - start,
+            overflow=overflow_after > max(overflow_before, 0),
+        )
+        return connection
+
+    def status_dict(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self.timeout(),
+            **self.stats.snapshot(),
+        }
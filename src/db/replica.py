@@ -0,0 +1,46 @@
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from src.config import settings
+import time
+
+LAST_WRITE_COOKIE = "last_write_at"
+LAST_WRITE_HEADER = "X-Last-Write-At"
+DB_ROUTE_HEADER = "X-DB-Route"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def get_last_write_at(request: Request) -> float | None:
+    raw_value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(
+        LAST_WRITE_COOKIE
+    )
+    try:
+        return float(raw_value) if raw_value else None
+    except ValueError:
+        return None
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    # A client that wrote recently reads from the primary until replicas catch up
+    last_write_at = get_last_write_at(request)
+    if last_write_at is None:
+        return False
+    return time.time() - last_write_at < settings.READ_YOUR_WRITES_SECONDS
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            last_write_at = f"{time.time():.6f}"
+            response.headers[LAST_WRITE_HEADER] = last_write_at
+            response.set_cookie(
+                LAST_WRITE_COOKIE,
+                last_write_at,
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite="lax",
+            )
+        db_route = getattr(request.state, "db_route", None)
+        if db_route is not None:
+            response.headers[DB_ROUTE_HEADER] = db_route
+        return response
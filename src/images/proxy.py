@@ -0,0 +1,211 @@
+from PIL import Image, ImageOps
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+import asyncio
+import bisect
+import hashlib
+import httpx
+import io
+import os
+import tempfile
+import threading
+
+from src.config import settings
+from src.db.models import DEFAULT_IMAGE_URL
+from .storage import BASE_DIR
+
+IMAGE_VARIANT_WIDTHS = (64, 128, 256, 512, 1024)
+IMAGE_FETCH_TIMEOUT_SECONDS = 10.0
+IMAGE_FETCH_MAX_REDIRECTS = 3
+# Eviction frees a little more than needed so it does not run on every write
+IMAGE_CACHE_LOW_WATERMARK = 0.9
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def snap_width(width: Optional[int]) -> int:
+    # Only a few widths are rendered, so each image has a handful of variants
+    if width is None:
+        return IMAGE_VARIANT_WIDTHS[-1]
+    position = bisect.bisect_left(IMAGE_VARIANT_WIDTHS, width)
+    return IMAGE_VARIANT_WIDTHS[min(position, len(IMAGE_VARIANT_WIDTHS) - 1)]
+
+
+# Image columns accept any URL, so only our storage and placeholder hosts are fetched
+def is_allowed_source_url(source_url: str) -> bool:
+    parts = urlsplit(source_url)
+    allowed_hosts = {host.lower() for host in settings.IMAGE_PROXY_ALLOWED_HOSTS}
+    allowed_hosts.add(urlsplit(DEFAULT_IMAGE_URL).hostname)
+    return parts.scheme in ("http", "https") and parts.hostname in allowed_hosts
+
+
+def variant_key(source_url: str, width: int, variant_format: str) -> str:
+    variant_id = f"{source_url}|{width}|{variant_format}"
+    return hashlib.sha256(variant_id.encode()).hexdigest()
+
+
+def render_variant(source: bytes, width: int, variant_format: str) -> bytes:
+    pillow_format, _ = VARIANT_FORMATS[variant_format]
+    with Image.open(io.BytesIO(source)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+        output = io.BytesIO()
+        image.save(output, format=pillow_format, quality=80)
+        return output.getvalue()
+
+
+class DiskLRUCache:
+    """Size bounded directory of rendered variants.
+
+    Reads touch the file's mtime, and eviction removes the oldest mtimes first,
+    so the files read least recently leave first. Every worker shares the
+    directory and recounts its real size before evicting.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return Path(self.directory, key)
+
+    def _scan(self) -> list:
+        entries = []
+        with os.scandir(self.directory) as directory_entries:
+            for entry in directory_entries:
+                if entry.is_file() and not entry.name.startswith("."):
+                    entry_stat = entry.stat()
+                    entries.append(
+                        (entry_stat.st_mtime, entry_stat.st_size, entry.path)
+                    )
+        return entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            content = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return content
+
+    def put(self, key: str, content: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written under a hidden name and renamed, readers never see a partial file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".")
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, self._path(key))
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += len(content)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._scan())
+        self._size = sum(size for _, size, _ in entries)
+        target_size = self.max_bytes * IMAGE_CACHE_LOW_WATERMARK
+        for _, size, path in entries:
+            if self._size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+class ImageProxy:
+    def __init__(self, cache: DiskLRUCache, concurrency: int):
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._rendering: dict = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=IMAGE_FETCH_TIMEOUT_SECONDS, follow_redirects=False
+            )
+        return self._http_client
+
+    async def _fetch_source(self, source_url: str) -> bytes:
+        static_dir = Path(BASE_DIR, "static").resolve()
+        if source_url.startswith("/static/"):
+            # Locally stored uploads are read from disk, never through HTTP
+            local_path = Path(BASE_DIR, source_url.lstrip("/")).resolve()
+            if not local_path.is_relative_to(static_dir):
+                raise ValueError(f"Image path outside static : {str(source_url)}")
+            return await asyncio.to_thread(local_path.read_bytes)
+
+        fetch_url = source_url
+        # Redirects are followed by hand so every hop is checked against the allowlist
+        for _ in range(IMAGE_FETCH_MAX_REDIRECTS + 1):
+            if not is_allowed_source_url(fetch_url):
+                raise ValueError(f"Unsupported image URL : {str(fetch_url)}")
+            async with self._client().stream("GET", fetch_url) as response:
+                if response.is_redirect:
+                    fetch_url = urljoin(fetch_url, response.headers["location"])
+                    continue
+                response.raise_for_status()
+                source = bytearray()
+                async for chunk in response.aiter_bytes():
+                    source.extend(chunk)
+                    if len(source) > settings.IMAGE_SOURCE_MAX_BYTES:
+                        raise ValueError(f"Source image too large : {str(source_url)}")
+                return bytes(source)
+        raise ValueError(f"Too many redirects for image : {str(source_url)}")
+
+    async def _render(
+        self, key: str, source_url: str, width: int, variant_format: str
+    ):
+        # Bounded, every distinct miss costs a large fetch and a full decode
+        async with self._semaphore:
+            source = await self._fetch_source(source_url)
+            # Decoding and resizing are CPU bound, keep them off the event loop
+            variant = await asyncio.to_thread(
+                render_variant, source, width, variant_format
+            )
+        await asyncio.to_thread(self.cache.put, key, variant)
+        return variant
+
+    async def get_variant(self, source_url: str, width: int, variant_format: str):
+        key = variant_key(source_url, width, variant_format)
+        variant = await asyncio.to_thread(self.cache.get, key)
+        if variant is not None:
+            return variant
+        # Concurrent misses for the same variant share one fetch and render
+        if key not in self._rendering:
+            render_task = asyncio.ensure_future(
+                self._render(key, source_url, width, variant_format)
+            )
+            self._rendering[key] = render_task
+            render_task.add_done_callback(lambda _: self._rendering.pop(key, None))
+        return await asyncio.shield(self._rendering[key])
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+image_proxy = ImageProxy(
+    DiskLRUCache(
+        Path(BASE_DIR, settings.IMAGE_CACHE_DIR), settings.IMAGE_CACHE_MAX_BYTES
+    ),
+    settings.IMAGE_RENDER_CONCURRENCY,
+)
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import Response
+from typing import Optional
+import uuid
+
+from src.db.etags import etag_matches
+from src.items_Categories.service import ItemService
+from src.items_Categories.cache import menu_cache, load_from_primary
+from .proxy import image_proxy, snap_width, variant_key, VARIANT_FORMATS
+
+image_router = APIRouter()
+item_service = ItemService()
+
+# The id stays the same when an item gets a new image, so clients revalidate often
+IMAGE_CACHE_CONTROL = "public, max-age=300"
+
+
+@image_router.get("/{owner_id}")
+async def get_image(
+    owner_id: uuid.UUID,
+    request: Request,
+    w: Optional[int] = Query(default=None, ge=1, le=4096),
+):
+    try:
+        source_url = await menu_cache.get_or_load(
+            ("image_url", owner_id),
+            lambda: load_from_primary(
+                lambda session: item_service.get_image_url(owner_id, session)
+            ),
+        )
+        if source_url is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Image for ID {str(owner_id)} unavailable at the database",
+            )
+        width = snap_width(w)
+        variant_format = (
+            "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        )
+        etag = f'"{variant_key(source_url, width, variant_format)[:32]}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMAGE_CACHE_CONTROL,
+            "Vary": "Accept",
+        }
+        if etag_matches(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        variant = await image_proxy.get_variant(source_url, width, variant_format)
+        return Response(
+            content=variant,
+            media_type=VARIANT_FORMATS[variant_format][1],
+            headers=headers,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error getting Image: -> {str(e)}",
+        )
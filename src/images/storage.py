@@ -0,0 +1,56 @@
+from pathlib import Path
+from typing import BinaryIO
+import cloudinary
+import cloudinary.uploader
+import shutil
+
+from src.config import settings
+
+cloudinary.config(
+    cloud_name=settings.CLOUDINARY_NAME,
+    api_key=settings.CLOUDINARY_API_KEY,
+    api_secret=settings.CLOUDINARY_SECRET,
+    secure=True,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# Backends are blocking on purpose, the upload queue runs them in worker threads.
+# They read the image straight from the ingested file object.
+class ImageStorage:
+    def upload(self, image_file: BinaryIO, sha256: str, extension: str) -> str:
+        raise NotImplementedError("Please Override 'upload' in child class")
+
+
+class CloudinaryStorage(ImageStorage):
+    def upload(self, image_file: BinaryIO, sha256: str, extension: str) -> str:
+        cloudinary_result = cloudinary.uploader.upload(image_file)
+        return cloudinary_result["url"]
+
+
+# Stands in for Cloudinary in development and tests, files are served from /static
+class LocalStorage(ImageStorage):
+    def __init__(self, image_dir: str, image_url: str):
+        self.image_dir = Path(BASE_DIR, image_dir)
+        self.image_url = image_url.rstrip("/")
+
+    def upload(self, image_file: BinaryIO, sha256: str, extension: str) -> str:
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        file_name = f"{sha256}{extension}"
+        with open(Path(self.image_dir, file_name), "wb") as destination:
+            shutil.copyfileobj(image_file, destination)
+        return f"{self.image_url}/{file_name}"
+
+
+def get_image_storage() -> ImageStorage:
+    if settings.IMAGE_STORAGE_BACKEND == "local":
+        return LocalStorage(settings.LOCAL_IMAGE_DIR, settings.LOCAL_IMAGE_URL)
+    if settings.IMAGE_STORAGE_BACKEND == "cloudinary":
+        return CloudinaryStorage()
+    raise ValueError(
+        f"Unknown image storage backend : {str(settings.IMAGE_STORAGE_BACKEND)}"
+    )
+
+
+image_storage = get_image_storage()
@@ -0,0 +1,192 @@
+from fastapi import HTTPException, status, UploadFile, File
+from typing import BinaryIO, Optional
+import asyncio
+import hashlib
+import logging
+import tempfile
+
+from src.db.redis import client
+from src.config import settings
+from .storage import image_storage
+
+UPLOAD_DRAIN_SECONDS = 30
+UPLOAD_ATTEMPTS = 3
+UPLOAD_RETRY_SECONDS = 2
+READ_CHUNK_SIZE = 64 * 1024
+# Ingested images stay in memory up to this size and roll over to disk beyond it
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Leading bytes of every format we accept, the declared content type is not trusted
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": ".jpg",
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+
+
+class IngestedImage:
+    def __init__(self, file: BinaryIO, sha256: str, extension: str, size: int):
+        self.file = file
+        self.sha256 = sha256
+        self.extension = extension
+        self.size = size
+        # Set once the upload is registered to run after commit, the commit and
+        # rollback hooks then close the file instead of the ingestor
+        self.queued = False
+
+    def release(self):
+        if not self.queued:
+            self.file.close()
+
+
+def image_hash_key(sha256: str) -> str:
+    # URLs from one backend are useless to another, so the backend is part of the key
+    return f"image:sha256:{settings.IMAGE_STORAGE_BACKEND}:{sha256}"
+
+
+def detect_image_extension(first_chunk: bytes) -> Optional[str]:
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if first_chunk.startswith(signature):
+            return extension
+    return None
+
+
+def _ingest(source: BinaryIO) -> IngestedImage:
+    first_chunk = source.read(READ_CHUNK_SIZE)
+    extension = detect_image_extension(first_chunk)
+    if extension is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only JPEG, PNG, and GIF images are allowed",
+        )
+
+    sink = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    image_hash = hashlib.sha256()
+    size = 0
+    chunk = first_chunk
+    try:
+        while chunk:
+            size += len(chunk)
+            if size > settings.IMAGE_MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Images must be at most {settings.IMAGE_MAX_UPLOAD_BYTES} bytes",
+                )
+            image_hash.update(chunk)
+            sink.write(chunk)
+            chunk = source.read(READ_CHUNK_SIZE)
+    except Exception:
+        sink.close()
+        raise
+    sink.seek(0)
+    return IngestedImage(sink, image_hash.hexdigest(), extension, size)
+
+
+# Validates, hashes and spools the upload in one pass, stopping at the first bad chunk.
+# The file is closed when the request ends, unless the upload was queued after commit.
+async def ingest_image(image_file: UploadFile = File(...)):
+    image = await asyncio.to_thread(_ingest, image_file.file)
+    try:
+        yield image
+    finally:
+        image.release()
+
+
+async def ingest_optional_image(image_file: Optional[UploadFile] = File(None)):
+    if image_file is None:
+        yield None
+        return
+    image = await asyncio.to_thread(_ingest, image_file.file)
+    try:
+        yield image
+    finally:
+        image.release()
+
+
+class ImageUploadQueue:
+    """Uploads ingested images in the background with bounded concurrency.
+
+    The blocking storage call runs in a worker thread, so the event loop keeps
+    serving requests. on_uploaded receives the hosted URL once the upload is done.
+    Failed uploads are retried a few times before they are logged and counted.
+    """
+
+    def __init__(self, concurrency: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self.uploaded = 0
+        self.failed = 0
+
+    async def _store(self, image: IngestedImage) -> str:
+        # The dedup index is only a shortcut, without Redis the image is uploaded anyway
+        try:
+            image_url = await client.get(image_hash_key(image.sha256))
+        except Exception:
+            logging.exception("Could not read the image dedup index")
+            image_url = None
+        # Identical bytes were uploaded before, reuse that URL
+        if image_url is not None:
+            return image_url.decode()
+        async with self._semaphore:
+            image.file.seek(0)
+            image_url = await asyncio.to_thread(
+                image_storage.upload, image.file, image.sha256, image.extension
+            )
+        try:
+            await client.set(image_hash_key(image.sha256), image_url)
+        except Exception:
+            logging.exception(
+                "Could not record %s in the image dedup index", image.sha256
+            )
+        return image_url
+
+    async def _upload(self, image: IngestedImage, on_uploaded):
+        try:
+            for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+                try:
+                    await on_uploaded(await self._store(image))
+                    self.uploaded += 1
+                    return
+                except Exception:
+                    if attempt == UPLOAD_ATTEMPTS:
+                        self.failed += 1
+                        logging.exception(
+                            "Image upload failed for %s after %s attempts",
+                            image.sha256,
+                            attempt,
+                        )
+                        return
+                    logging.warning(
+                        "Image upload attempt %s failed for %s, retrying",
+                        attempt,
+                        image.sha256,
+                    )
+                    await asyncio.sleep(UPLOAD_RETRY_SECONDS * attempt)
+        finally:
+            image.file.close()
+
+    def submit(self, image: IngestedImage, on_uploaded):
+        image.queued = True
+        upload_task = asyncio.create_task(self._upload(image, on_uploaded))
+        self._tasks.add(upload_task)
+        upload_task.add_done_callback(self._tasks.discard)
+        return upload_task
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "uploaded": self.uploaded,
+            "failed": self.failed,
+        }
+
+    async def drain(self, timeout: float = UPLOAD_DRAIN_SECONDS):
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+
+image_upload_queue = ImageUploadQueue(settings.IMAGE_UPLOAD_CONCURRENCY)
@@ -0,0 +1,170 @@
+from typing import Optional
+import asyncio
+import brotli
+import gzip
+import json
+import logging
+import time
+
+from src.db.redis import client
+from src.db.main import async_session_factory
+from src.config import settings
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+
+# A lost key starts again at the current time in milliseconds, never at a number
+# already handed out in an ETag before Redis was flushed or failed over
+def seed_version() -> int:
+    return int(time.time() * 1000)
+
+
+class MenuCache:
+    """Per worker cache of serialized menu payloads.
+
+    Entries belong to one catalog version. Writers bump the shared version in
+    Redis after commit, and every worker drops its entries once it sees a new
+    version. Workers re-read the version at most every MENU_CACHE_VERSION_TTL
+    seconds, so a bump from another worker is visible within that window.
+
+    Entry kinds listed in separate_limits live in their own bounded dict, so
+    high churn free text keys never evict the menu and listing pages.
+    """
+
+    def __init__(self, separate_limits: Optional[dict] = None):
+        self.version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self._limits = {
+            None: settings.MENU_CACHE_MAX_ENTRIES,
+            **(separate_limits or {}),
+        }
+        self._entries: dict = {kind: {} for kind in self._limits}
+        self._loading: dict = {}
+
+    def _kind(self, key) -> Optional[str]:
+        return key[0] if key[0] in self._limits else None
+
+    def _clear(self):
+        for entries in self._entries.values():
+            entries.clear()
+
+    def _set_version(self, version: int):
+        if version != self.version:
+            self._clear()
+            self.version = version
+        self._version_checked_at = time.monotonic()
+
+    async def current_version(self) -> Optional[int]:
+        if (
+            self.version is not None
+            and time.monotonic() - self._version_checked_at
+            < settings.MENU_CACHE_VERSION_TTL
+        ):
+            return self.version
+        try:
+            raw_version = await client.get(CATALOG_VERSION_KEY)
+            if raw_version is None:
+                await client.set(CATALOG_VERSION_KEY, seed_version(), nx=True)
+                raw_version = await client.get(CATALOG_VERSION_KEY)
+        except Exception:
+            # Without the shared version we cannot trust local entries, bypass the cache
+            logging.exception("Could not read the catalog version")
+            return None
+        self._set_version(int(raw_version))
+        return self.version
+
+    def get(self, key):
+        return self._entries[self._kind(key)].get(key)
+
+    def set(self, key, value, version: int):
+        if version != self.version:
+            return
+        kind = self._kind(key)
+        entries = self._entries[kind]
+        if len(entries) >= self._limits[kind]:
+            entries.pop(next(iter(entries)))
+        entries[key] = value
+
+    async def get_or_load(self, key, loader):
+        version = await self.current_version()
+        if version is None:
+            return await loader()
+        cached_value = self.get(key)
+        if cached_value is not None:
+            return cached_value
+        # Concurrent misses for the same entry share a single load
+        loading_key = (version, key)
+        if loading_key in self._loading:
+            return await asyncio.shield(self._loading[loading_key])
+        load_task = asyncio.ensure_future(loader())
+        self._loading[loading_key] = load_task
+        try:
+            value = await asyncio.shield(load_task)
+        finally:
+            self._loading.pop(loading_key, None)
+        if value is not None:
+            self.set(key, value, version)
+        return value
+
+    async def bump(self):
+        # Dropped first, so this worker stops serving pre-write data even if Redis fails
+        self._clear()
+        self.version = None
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.set(CATALOG_VERSION_KEY, seed_version(), nx=True)
+                pipe.incr(CATALOG_VERSION_KEY)
+                _, version = await pipe.execute()
+            self._set_version(version)
+        except Exception:
+            logging.exception("Could not bump the catalog version")
+
+
+menu_cache = MenuCache(separate_limits={"search": settings.SEARCH_CACHE_MAX_ENTRIES})
+
+
+# Cache fills are served and ETagged under the current version until the next
+# bump, so they read the primary. A lagging replica could miss that very write.
+async def load_from_primary(load):
+    async with async_session_factory() as session:
+        return await load(session)
+
+
+class MenuSnapshot:
+    """Whole menu rendered once per catalog version, in every encoding we serve.
+
+    The version is the change log position the menu was read at, clients pass
+    it to /inventory/changes as since to pick up later edits.
+    """
+
+    def __init__(self, version: int, items: list[dict]):
+        self.version = version
+        self.bodies = {
+            "identity": json.dumps(
+                {
+                    "message": "Menu fetched successfully",
+                    "version": version,
+                    "items": items,
+                },
+                separators=(",", ":"),
+            ).encode()
+        }
+        self.bodies["gzip"] = gzip.compress(self.bodies["identity"], compresslevel=9)
+        self.bodies["br"] = brotli.compress(self.bodies["identity"], quality=11)
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    accepted = set()
+    for coding in accept_encoding.lower().split(","):
+        name, _, params = coding.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip())
+    for encoding in ("br", "gzip"):
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return "identity"
+
+
+async def build_menu_snapshot(version: int, items: list[dict]) -> MenuSnapshot:
+    # Compression of a large menu is CPU bound, keep it off the event loop
+    return await asyncio.to_thread(MenuSnapshot, version, items)
@@ -7,22 +7,54 @@ from fastapi import (
     Form,
     UploadFile,
     File,
+    Query,
+    Request,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from typing import Optional
 import tempfile
+import uuid
+import csv
+import logging
 import shutil
-from .service import ItemService
+from .service import (
+    ItemService,
+    normalize_search_query,
+    read_bulk_import_rows,
+    SEARCH_MAX_RESULTS,
+    BULK_IMPORT_MAX_ROWS,
+)
+from .cache import (
+    menu_cache,
+    build_menu_snapshot,
+    negotiate_encoding,
+    load_from_primary,
+)
+from .suggest import suggest_index, normalize_suggest_text, SUGGEST_MAX_RESULTS
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.db.main import get_session
-from src.db.models import User
+from src.db.main import (
+    get_unit_of_work,
+    get_read_session,
+    async_session_factory,
+    on_commit,
+    on_rollback,
+    run_after_commit,
+)
+from src.db.models import User, DEFAULT_IMAGE_URL
+from src.images.uploads import (
+    IngestedImage,
+    image_upload_queue,
+    ingest_image,
+    ingest_optional_image,
+)
+from functools import partial
 from src.auth.utils import convert_str
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.db.etags import make_etag, etag_matches, not_modified, with_etag
 from src.auth.dependencies import (
     AccessTokenBearer,
     get_current_user,
     RoleChecker,
-    save_temp_image,
-    uploadCloudinary,
 )
 from .schema import ItemSchema, CategorySchema, ItemUpdateSchema, CategoryUpdateSchema
 
@@ -34,6 +66,40 @@ manager_user = Depends(RoleChecker(["admin", "manager"]))
 admin_manager_checker = Depends(RoleChecker(["admin", "manager"]))
 
 
+async def swap_image(
+    entity: str, owner_id: uuid.UUID, upload_token: uuid.UUID, image_url: str
+):
+    async with async_session_factory() as session:
+        swapped = await item_service.swap_image(
+            entity, owner_id, upload_token, image_url, session
+        )
+        await session.commit()
+        await run_after_commit(session)
+    if not swapped:
+        logging.info("Skipped a superseded image upload for %s %s", entity, owner_id)
+
+
+# Queued after commit so the upload never races the row it updates
+async def upload_image_after_commit(
+    session: AsyncSession, image: IngestedImage, entity: str, owner_id: uuid.UUID
+):
+    upload_token = await item_service.claim_image_upload(entity, owner_id, session)
+
+    async def queue_upload():
+        image_upload_queue.submit(
+            image, partial(swap_image, entity, owner_id, upload_token)
+        )
+
+    async def discard_image():
+        image.file.close()
+
+    # The unit of work may commit after the ingestor's teardown, so the file belongs
+    # to these hooks from here on. Exactly one of them runs.
+    image.queued = True
+    on_commit(session, queue_upload)
+    on_rollback(session, discard_image)
+
+
 def parse_category_form_data(
     name: str = Form(), type_of: str = Form(), description: str = Form()
 ) -> CategorySchema:
@@ -86,21 +152,231 @@ def parse_update_category_form_data(
     return {key: value for key, value in category_data.items() if value is not None}
 
 
-@item_router.get("/all")
-async def get_all_items(session: AsyncSession = Depends(get_session)):
+@item_router.get("/menu")
+async def get_menu(request: Request):
+    try:
+        version = await menu_cache.current_version()
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        # Each encoding is a different representation, so it gets its own ETag
+        etag = make_etag("menu", version, encoding) if version is not None else None
+        if etag is not None and etag_matches(request, etag):
+            return not_modified(etag)
+
+        async def load_snapshot(session: AsyncSession):
+            changes_version, menu_items = await item_service.get_menu_items(session)
+            return await build_menu_snapshot(changes_version, menu_items)
+
+        snapshot = await menu_cache.get_or_load(
+            ("menu",), lambda: load_from_primary(load_snapshot)
+        )
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        # Pre-rendered bytes, nothing is serialized per request
+        return with_etag(
+            Response(
+                content=snapshot.bodies[encoding],
+                media_type="application/json",
+                headers=headers,
+            ),
+            etag,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error Getting menu: -> {str(e)}",
+        )
+
+
+@item_router.get("/changes")
+async def get_catalog_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_read_session),
+):
+    try:
+        catalog_changes = await item_service.get_catalog_changes(
+            since=since, session=session, limit=limit
+        )
+        return JSONResponse(
+            content={
+                "message": "Catalog changes fetched successfully",
+                "since": since,
+                **catalog_changes,
+            },
+            status_code=status.HTTP_200_OK,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting Catalog changes: {str(e)}",
+        )
+
+
+@item_router.get("/category/{category_name}/items")
+async def get_category_items(
+    category_name: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    try:
+        version = await menu_cache.current_version()
+        etag = (
+            make_etag("category_items", version, category_name, cursor, limit)
+            if version is not None
+            else None
+        )
+        if etag is not None and etag_matches(request, etag):
+            return not_modified(etag)
+        category_items = await menu_cache.get_or_load(
+            ("category_items", category_name, cursor, limit),
+            lambda: load_from_primary(
+                lambda session: item_service.get_category_items(
+                    category_name, session, cursor=cursor, limit=limit
+                )
+            ),
+        )
+        if category_items is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Category {str(category_name)} doesnot exist in the database",
+            )
+        items, next_cursor = category_items
+        return with_etag(
+            JSONResponse(
+                content={
+                    "message": f"Items in Category {str(category_name)} fetched successfully",
+                    "items": items,
+                    "next_cursor": next_cursor,
+                },
+                status_code=status.HTTP_200_OK,
+            ),
+            etag,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting Category Items: {str(e)}",
+        )
+
+
+@item_router.get("/suggest")
+async def suggest_items(
+    prefix: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=SUGGEST_MAX_RESULTS),
+):
     try:
-        all_items = await item_service.get_all_items(session)
-        if not all_items:
+        if not normalize_suggest_text(prefix):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Something went wrong when fetching All Items",
+                detail="prefix must contain at least one non space character",
             )
+        # Answers from memory, a stale index is refreshed in the background
+        await suggest_index.refresh_if_stale()
         return JSONResponse(
             content={
-                "message": "All Items fetched successfully",
-                "items": all_items,
-            }
+                "message": "Item suggestions fetched successfully",
+                "items": suggest_index.suggest(prefix, limit=limit),
+            },
+            status_code=status.HTTP_200_OK,
         )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting Item suggestions: {str(e)}",
+        )
+
+
+@item_router.get("/search")
+async def search_items(
+    request: Request,
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=20, ge=1, le=SEARCH_MAX_RESULTS),
+):
+    try:
+        query_text = normalize_search_query(q)
+        version = await menu_cache.current_version()
+        etag = (
+            make_etag("search", version, query_text, limit)
+            if version is not None
+            else None
+        )
+        if etag is not None and etag_matches(request, etag):
+            return not_modified(etag)
+        search_results = await menu_cache.get_or_load(
+            ("search", query_text, limit),
+            lambda: load_from_primary(
+                lambda session: item_service.search_items(
+                    query_text, session, limit=limit
+                )
+            ),
+        )
+        return with_etag(
+            JSONResponse(
+                content={
+                    "message": "Items searched successfully",
+                    "items": search_results,
+                },
+                status_code=status.HTTP_200_OK,
+            ),
+            etag,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching Items: {str(e)}",
+        )
+
+
+@item_router.get("/all")
+async def get_all_items(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    try:
+        version = await menu_cache.current_version()
+        etag = (
+            make_etag("items", version, cursor, limit) if version is not None else None
+        )
+        if etag is not None and etag_matches(request, etag):
+            return not_modified(etag)
+        all_items, next_cursor = await menu_cache.get_or_load(
+            ("items", cursor, limit),
+            lambda: load_from_primary(
+                lambda session: item_service.get_all_items(
+                    session, cursor=cursor, limit=limit
+                )
+            ),
+        )
+        if not all_items and cursor is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Something went wrong when fetching All Items",
+            )
+        return with_etag(
+            JSONResponse(
+                content={
+                    "message": "All Items fetched successfully",
+                    "items": all_items,
+                    "next_cursor": next_cursor,
+                }
+            ),
+            etag,
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
@@ -108,17 +384,76 @@ async def get_all_items(session: AsyncSession = Depends(get_session)):
         )
 
 
-@item_router.get("/item/{item_id}")
-async def get_single_item(item_id: str, session: AsyncSession = Depends(get_session)):
+@item_router.get("/items")
+async def get_items_by_ids(
+    ids: str = Query(min_length=1),
+    session: AsyncSession = Depends(get_read_session),
+):
     try:
-        item = await item_service.get_item(item_id=item_id, session=session)
+        try:
+            item_ids = [uuid.UUID(item_id.strip()) for item_id in ids.split(",")]
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ids must be a comma separated list of Item IDs",
+            )
+        if len(item_ids) > MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_PAGE_SIZE} Item IDs can be fetched at once",
+            )
+        items = await item_service.get_items_by_ids(item_ids, session)
         return JSONResponse(
             content={
-                "message": "Item fetched successfully",
-                "item": convert_str(item.model_dump()),
+                "message": "Items fetched successfully",
+                "items": [convert_str(item.model_dump()) for item in items.values()],
+                "missing": [
+                    str(item_id) for item_id in set(item_ids) if item_id not in items
+                ],
             },
             status_code=status.HTTP_200_OK,
         )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting Items info: {str(e)}",
+        )
+
+
+@item_router.get("/item/{item_id}")
+async def get_single_item(item_id: str, request: Request):
+    try:
+        version = await menu_cache.current_version()
+        etag = make_etag("item", version, item_id) if version is not None else None
+        if etag is not None and etag_matches(request, etag):
+            return not_modified(etag)
+        item_dict = await menu_cache.get_or_load(
+            ("item", item_id),
+            lambda: load_from_primary(
+                lambda session: item_service.get_item_details(
+                    item_id=item_id, session=session
+                )
+            ),
+        )
+        if item_dict is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Item with Item ID {str(item_id)} unavailable at the database",
+            )
+        return with_etag(
+            JSONResponse(
+                content={
+                    "message": "Item fetched successfully",
+                    "item": item_dict,
+                },
+                status_code=status.HTTP_200_OK,
+            ),
+            etag,
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -129,19 +464,16 @@ async def get_single_item(item_id: str, session: AsyncSession = Depends(get_sess
 @item_router.post("/create", dependencies=[admin_manager_checker])
 async def create_new_Item(
     item_details: ItemSchema = Depends(parse_item_form_data),
-    image_path=Depends(save_temp_image),
-    session: AsyncSession = Depends(get_session),
+    image: IngestedImage = Depends(ingest_image),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
-        cloudinary_response = await uploadCloudinary(image_path)
-        if not cloudinary_response:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error while processing image. Please check the image and try again",
-            )
-        cloudinary_image_url = cloudinary_response.get("url")
+        # The placeholder is swapped for the uploaded image in the background
         new_item_details = await item_service.create_new_item(
-            item_details, cloudinary_image_url, session
+            item_details, DEFAULT_IMAGE_URL, session
+        )
+        await upload_image_after_commit(
+            session, image, "item", new_item_details.uid
         )
 
         return JSONResponse(
@@ -160,25 +492,54 @@ async def create_new_Item(
         )
 
 
+@item_router.post("/bulk_import", dependencies=[admin_manager_checker])
+async def bulk_import_items(
+    import_file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_unit_of_work),
+):
+    try:
+        try:
+            rows = read_bulk_import_rows(
+                import_file.filename or "", await import_file.read()
+            )
+        except (ValueError, csv.Error) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not read the import file: {str(e)}",
+            )
+        if len(rows) > BULK_IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {BULK_IMPORT_MAX_ROWS} Items can be imported at once",
+            )
+        import_result = await item_service.bulk_upsert_items(rows, session)
+        return JSONResponse(
+            content={"message": "Items imported successfully", **import_result},
+            status_code=status.HTTP_200_OK,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Something went wrong while importing Items :-> {str(e)}",
+        )
+
+
 @item_router.post("/category/create", dependencies=[admin_manager_checker])
 async def create_new_category(
     form_data: CategorySchema = Depends(parse_category_form_data),
-    image_path: str = Depends(save_temp_image),
-    session: AsyncSession = Depends(get_session),
+    image: IngestedImage = Depends(ingest_image),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
-    #  First store the image in Temp and store it in cloudinary
+    #  The image is uploaded in the background after commit
 
     try:
-        cloudinary_response = await uploadCloudinary(image_path)
-
-        if not cloudinary_response:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error while processing image. Please check the image and try again",
-            )
-        cloudinary_url = cloudinary_response.get("url")
         new_category = await item_service.create_new_category(
-            form_data, cloudinary_url, session
+            form_data, DEFAULT_IMAGE_URL, session
+        )
+        await upload_image_after_commit(
+            session, image, "category", new_category.uid
         )
         return JSONResponse(
             content={
@@ -200,8 +561,8 @@ async def create_new_category(
 async def update_item(
     item_id: str,
     updated_info_dict: dict = Depends(parse_update_item_form_data),
-    image_file: UploadFile = File(None),
-    session: AsyncSession = Depends(get_session),
+    image: Optional[IngestedImage] = Depends(ingest_optional_image),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         item_info = await item_service.get_item(item_id, session)
@@ -210,15 +571,12 @@ async def update_item(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Item info with Item ID {str(item_id)} unavailable at the database",
             )
-        image_path = save_temp_image(image_file) if image_file is not None else None
-
-        if image_path is not None:
-            cloudinary_response = await uploadCloudinary(image_path)
-            cloudinary_image = cloudinary_response.get("url")
-            updated_info_dict["image"] = cloudinary_image
         update_item_response = await item_service.update_Item(
             item=item_info, updated_item=updated_info_dict, session=session
         )
+        # The current image stays until the new one is uploaded
+        if image is not None:
+            await upload_image_after_commit(session, image, "item", item_info.uid)
 
         return JSONResponse(
             content={
@@ -238,8 +596,8 @@ async def update_item(
 async def update_category(
     category_name: str,
     update_category_dict: dict = Depends(parse_update_category_form_data),
-    image_file: UploadFile = File(None),
-    session: AsyncSession = Depends(get_session),
+    image: Optional[IngestedImage] = Depends(ingest_optional_image),
+    session: AsyncSession = Depends(get_unit_of_work),
 ):
     try:
         print("CATEGORY NAME : ", category_name)
@@ -252,16 +610,15 @@ async def update_category(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Category info with Category name {str(category_name)} unavailable at the database",
             )
-        image_path = save_temp_image(image_file) if image_file is not None else None
-        if image_path is not None:
-            cloudinary_response = await uploadCloudinary(image_path)
-            cloudinary_image = cloudinary_response.get("url")
-            update_category_dict["image"] = cloudinary_image
         update_category_response = await item_service.update_Category(
             category=category_info,
             updated_category=update_category_dict,
             session=session,
         )
+        if image is not None:
+            await upload_image_after_commit(
+                session, image, "category", category_info.uid
+            )
         return JSONResponse(
             content={
                 "message": f"Category updated successfully",
@@ -280,7 +637,7 @@ async def update_category(
 
 
 @item_router.delete("/{item_id}", dependencies=[admin_manager_checker])
-async def delete_item(item_id: str, session: AsyncSession = Depends(get_session)):
+async def delete_item(item_id: str, session: AsyncSession = Depends(get_unit_of_work)):
     try:
         await item_service.delete_Item(item_id, session)
         return JSONResponse(
@@ -299,7 +656,7 @@ async def delete_item(item_id: str, session: AsyncSession = Depends(get_session)
 
 
 @item_router.delete("/category/{category_name}", dependencies=[admin_manager_checker])
-async def delete_item(category_name: str, session: AsyncSession = Depends(get_session)):
+async def delete_item(category_name: str, session: AsyncSession = Depends(get_unit_of_work)):
     try:
         await item_service.delete_Category(category_name=category_name, session=session)
         return JSONResponse(
@@ -15,6 +15,11 @@ class ItemSchema(BaseModel):
     category: str
 
 
+# One row of a bulk import, the image is an already hosted URL
+class BulkItemSchema(ItemSchema):
+    image: Optional[str] = Field(default=None, max_length=250, pattern=r"^https?://")
+
+
 class ItemUpdateSchema(BaseModel):
     name: Optional[str]
     description: Optional[str]
@@ -3,24 +3,461 @@ from sqlmodel import select
 from fastapi import status, HTTPException
 
 
-from src.db.models import Item, Item_Category, Category
-from .schema import ItemSchema, CategorySchema, ItemUpdateSchema
+from sqlalchemy import text, func, or_, any_, bindparam, literal_column, update
+import sqlalchemy.dialects.postgresql as pg
+from src.db.models import (
+    Item,
+    Item_Category,
+    Category,
+    Catalog_Change,
+    DEFAULT_IMAGE_URL,
+)
+from .schema import ItemSchema, CategorySchema, ItemUpdateSchema, BulkItemSchema
 from src.auth.utils import convert_str
+from src.db.loaders import loader_profile
+from src.db.pagination import paginate, DEFAULT_PAGE_SIZE
+from src.db.main import on_commit
+from .cache import menu_cache
+from .suggest import suggest_index
+from functools import partial
+from pydantic import ValidationError
+from typing import Optional
+import csv
+import io
+import json
+import re
+import uuid
+
+# Serializes change log writers so versions become visible in assignment order
+CATALOG_CHANGES_LOCK_ID = 7201820417
+
+CHANGE_INSERT = "insert"
+CHANGE_UPDATE = "update"
+CHANGE_DELETE = "delete"
+
+# Columns a menu listing shows, the description is only sent with item details
+ITEM_LISTING_COLUMNS = (
+    Item.uid,
+    Item.name,
+    Item.sku,
+    Item.size,
+    Item.price,
+    Item.image,
+)
+
+SEARCH_MAX_RESULTS = 50
+
+IMAGE_OWNERS = {"item": Item, "category": Category}
+
+BULK_IMPORT_MAX_ROWS = 10000
+BULK_IMPORT_BATCH_SIZE = 500
+SEARCH_WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_search_query(query_text: str) -> str:
+    return " ".join(SEARCH_WORD_PATTERN.findall(query_text.lower()))
+
+
+def suggest_entry(item: Item) -> dict:
+    return {"uid": str(item.uid), "name": item.name, "sku": item.sku}
+
+
+def read_bulk_import_rows(file_name: str, content: bytes) -> list[dict]:
+    # CSV by extension, JSON lines otherwise. Row numbers count from 1.
+    text_content = content.decode("utf-8-sig")
+    if file_name.lower().endswith(".csv"):
+        return [
+            {
+                key: value
+                for key, value in row.items()
+                if key is not None and value not in (None, "")
+            }
+            for row in csv.DictReader(io.StringIO(text_content))
+        ]
+    rows = []
+    for line_number, line in enumerate(text_content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        rows.append(row)
+    return rows
 
 
 class ItemService:
-    async def get_all_items(self, session: AsyncSession):
+    async def record_catalog_changes(
+        self, entity: str, entity_ids: list, op: str, session: AsyncSession
+    ):
+        if not entity_ids:
+            return
+        # Held until commit, so a reader never sees version N+1 before version N
+        await session.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"),
+            {"lock_id": CATALOG_CHANGES_LOCK_ID},
+        )
+        session.add_all(
+            [
+                Catalog_Change(entity=entity, entity_id=entity_id, op=op)
+                for entity_id in entity_ids
+            ]
+        )
+        await session.flush()
+
+    async def get_category_item_ids(
+        self, category_id: uuid.UUID, session: AsyncSession
+    ) -> list:
+        statement = select(Item_Category.item_id).where(
+            Item_Category.category_id == category_id
+        )
+        return (await session.exec(statement)).all()
+
+    async def record_category_items_changed(
+        self, category_id: uuid.UUID, session: AsyncSession
+    ):
+        # Items carry their category names, so they change with the category
+        item_ids = await self.get_category_item_ids(category_id, session)
+        await self.record_catalog_changes("item", item_ids, CHANGE_UPDATE, session)
+
+    async def get_catalog_changes(
+        self, since: int, session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE
+    ):
+        try:
+            statement = (
+                select(Catalog_Change)
+                .where(Catalog_Change.version > since)
+                .order_by(Catalog_Change.version)
+                .limit(limit + 1)
+            )
+            changes = (await session.exec(statement)).all()
+            has_more = len(changes) > limit
+            changes = changes[:limit]
+            version = changes[-1].version if changes else since
+
+            # Only the latest change per row matters
+            latest_changes = {}
+            for change in changes:
+                latest_changes[(change.entity, change.entity_id)] = change.op
+            changed_ids = {"item": [], "category": []}
+            deleted = []
+            for (entity, entity_id), op in latest_changes.items():
+                if op == CHANGE_DELETE:
+                    deleted.append({"entity": entity, "uid": str(entity_id)})
+                else:
+                    changed_ids[entity].append(entity_id)
+
+            items = []
+            if changed_ids["item"]:
+                item_statement = (
+                    select(Item)
+                    .where(Item.uid.in_(changed_ids["item"]))
+                    .options(*loader_profile("item_detail"))
+                )
+                for item in (await session.exec(item_statement)).all():
+                    item_dict = convert_str(item.model_dump())
+                    item_dict["categories"] = [
+                        category.name for category in item.categories
+                    ]
+                    items.append(item_dict)
+            categories = []
+            if changed_ids["category"]:
+                category_statement = (
+                    select(Category)
+                    .where(Category.uid.in_(changed_ids["category"]))
+                    .options(*loader_profile("category_detail"))
+                )
+                categories = [
+                    convert_str(category.model_dump())
+                    for category in (await session.exec(category_statement)).all()
+                ]
+
+            # Rows deleted after this window are already gone, report them as deleted
+            found_ids = {item["uid"] for item in items} | {
+                category["uid"] for category in categories
+            }
+            for entity, entity_ids in changed_ids.items():
+                deleted.extend(
+                    {"entity": entity, "uid": str(entity_id)}
+                    for entity_id in entity_ids
+                    if str(entity_id) not in found_ids
+                )
+            return {
+                "version": version,
+                "has_more": has_more,
+                "items": items,
+                "categories": categories,
+                "deleted": deleted,
+            }
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error finding Catalog Changes -> {str(e)}",
+            )
+
+
+    async def get_all_items(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
         try:
-            statement = select(Item)
-            result = (await session.exec(statement)).all()
+            statement = select(Item).options(*loader_profile("menu_listing"))
+            result, next_cursor = await paginate(
+                session,
+                statement,
+                order_by=[Item.name, Item.uid],
+                cursor=cursor,
+                limit=limit,
+            )
             converted_result = [convert_str(item.model_dump()) for item in result]
-            return converted_result
+            return converted_result, next_cursor
+        except HTTPException as e:
+            raise e
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error finding Items -> {str(e)}",
             )
 
+    async def get_changes_version(self, session: AsyncSession) -> int:
+        statement = select(func.coalesce(func.max(Catalog_Change.version), 0))
+        return (await session.exec(statement)).one()
+
+    async def get_menu_items(self, session: AsyncSession):
+        try:
+            # Read before the rows, a change landing in between is replayed by
+            # /changes instead of being skipped
+            changes_version = await self.get_changes_version(session)
+            statement = (
+                select(Item)
+                .options(*loader_profile("menu_listing"))
+                .order_by(Item.name, Item.uid)
+            )
+            result = await session.exec(statement)
+            return changes_version, [
+                convert_str(item.model_dump()) for item in result.all()
+            ]
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error finding Menu Items -> {str(e)}",
+            )
+
+    async def get_category_items(
+        self,
+        category_name: str,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ):
+        try:
+            statement = (
+                select(*ITEM_LISTING_COLUMNS)
+                .join(Item_Category, Item_Category.item_id == Item.uid)
+                .join(Category, Category.uid == Item_Category.category_id)
+                .where(Category.name == category_name)
+            )
+            result, next_cursor = await paginate(
+                session,
+                statement,
+                order_by=[Item.name, Item.uid],
+                cursor=cursor,
+                limit=limit,
+            )
+            if not result and cursor is None:
+                # Tell an empty category apart from a missing one
+                if await self.get_category_details(category_name, session) is None:
+                    return None
+            converted_result = [convert_str(dict(row._mapping)) for row in result]
+            return converted_result, next_cursor
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error finding Category Items -> {str(e)}",
+            )
+
+    async def search_items(
+        self,
+        query_text: str,
+        session: AsyncSession,
+        limit: int = SEARCH_MAX_RESULTS,
+    ):
+        try:
+            search_words = query_text.split()
+            if not search_words:
+                return []
+            # Every word must match, the last one as a prefix for typeahead
+            ts_query = func.to_tsquery(
+                "simple",
+                " & ".join(search_words[:-1] + [f"{search_words[-1]}:*"]),
+            )
+            search_vector = Item.__table__.c.search_vector
+            lower_name = func.lower(Item.name)
+            # Normalized queries only hold word characters, escape the "_" wildcard
+            name_prefix = query_text.replace("_", "\\_")
+            rank = func.ts_rank(search_vector, ts_query) + func.similarity(
+                lower_name, query_text
+            )
+            statement = (
+                select(*ITEM_LISTING_COLUMNS, rank.label("rank"))
+                .where(
+                    or_(
+                        search_vector.op("@@")(ts_query),
+                        lower_name.like(f"{name_prefix}%"),
+                        # Trigram similarity catches typos like "piza"
+                        lower_name.op("%")(query_text),
+                    )
+                )
+                .order_by(rank.desc(), Item.name, Item.uid)
+                .limit(limit)
+            )
+            result = await session.exec(statement)
+            return [convert_str(dict(row._mapping)) for row in result.all()]
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error searching Items -> {str(e)}",
+            )
+
+    async def bulk_upsert_items(self, rows: list[dict], session: AsyncSession):
+        try:
+            errors = []
+            valid_rows = {}
+            for row_number, row in enumerate(rows, start=1):
+                try:
+                    item_details = BulkItemSchema(**row)
+                except ValidationError as e:
+                    errors.append(
+                        {
+                            "row": row_number,
+                            "sku": row.get("sku"),
+                            "errors": e.errors(
+                                include_url=False,
+                                include_context=False,
+                                include_input=False,
+                            ),
+                        }
+                    )
+                    continue
+                if item_details.sku in valid_rows:
+                    errors.append(
+                        {
+                            "row": row_number,
+                            "sku": item_details.sku,
+                            "errors": f"SKU already used in row {valid_rows[item_details.sku][0]}",
+                        }
+                    )
+                    continue
+                valid_rows[item_details.sku] = (row_number, item_details)
+
+            # Every category name in the file in one query
+            category_names = list(
+                {item_details.category for _, item_details in valid_rows.values()}
+            )
+            category_statement = select(Category.uid, Category.name).where(
+                Category.name
+                == any_(
+                    bindparam(
+                        "category_names",
+                        value=category_names,
+                        type_=pg.ARRAY(pg.VARCHAR),
+                    )
+                )
+            )
+            category_ids = {
+                row.name: row.uid
+                for row in (await session.exec(category_statement)).all()
+            }
+            item_values = []
+            for sku, (row_number, item_details) in list(valid_rows.items()):
+                if item_details.category not in category_ids:
+                    errors.append(
+                        {
+                            "row": row_number,
+                            "sku": sku,
+                            "errors": f"The Category {str(item_details.category)} doesnot exist in the database",
+                        }
+                    )
+                    del valid_rows[sku]
+                    continue
+                item_values.append(
+                    {
+                        "uid": uuid.uuid4(),
+                        "name": item_details.name,
+                        "description": item_details.description,
+                        "sku": sku,
+                        "size": item_details.size,
+                        "price": item_details.price,
+                        "image": item_details.image or DEFAULT_IMAGE_URL,
+                    }
+                )
+
+            inserted_ids, updated_ids, links = [], [], []
+            for start in range(0, len(item_values), BULK_IMPORT_BATCH_SIZE):
+                insert_statement = pg.insert(Item).values(
+                    item_values[start : start + BULK_IMPORT_BATCH_SIZE]
+                )
+                excluded = insert_statement.excluded
+                upsert_statement = insert_statement.on_conflict_do_update(
+                    index_elements=[Item.sku],
+                    set_={
+                        "name": excluded.name,
+                        "description": excluded.description,
+                        "size": excluded.size,
+                        "price": excluded.price,
+                        # Rows without an image keep the one they already have
+                        "image": func.coalesce(
+                            func.nullif(excluded.image, DEFAULT_IMAGE_URL), Item.image
+                        ),
+                    },
+                ).returning(
+                    Item.uid, Item.sku, literal_column("xmax = 0").label("inserted")
+                )
+                for row in (await session.execute(upsert_statement)).all():
+                    (inserted_ids if row.inserted else updated_ids).append(row.uid)
+                    links.append(
+                        {
+                            "item_id": row.uid,
+                            "category_id": category_ids[
+                                valid_rows[row.sku][1].category
+                            ],
+                        }
+                    )
+
+            for start in range(0, len(links), BULK_IMPORT_BATCH_SIZE):
+                await session.execute(
+                    pg.insert(Item_Category)
+                    .values(links[start : start + BULK_IMPORT_BATCH_SIZE])
+                    .on_conflict_do_nothing()
+                )
+
+            await self.record_catalog_changes(
+                "item", inserted_ids, CHANGE_INSERT, session
+            )
+            await self.record_catalog_changes(
+                "item", updated_ids, CHANGE_UPDATE, session
+            )
+            if inserted_ids or updated_ids:
+                on_commit(session, menu_cache.bump)
+            return {
+                "inserted": len(inserted_ids),
+                "updated": len(updated_ids),
+                "errors": sorted(errors, key=lambda error: error["row"]),
+            }
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error importing Items: {str(e)}",
+            )
+
     async def create_new_item(
         self, item_details: ItemSchema, item_image: str, session: AsyncSession
     ):
@@ -47,26 +484,124 @@ class ItemService:
                 item_id=new_item.uid, category_id=category_info.uid
             )
             session.add(new_item_category)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_item)
+            await self.record_catalog_changes(
+                "item", [new_item.uid], CHANGE_INSERT, session
+            )
+            on_commit(session, menu_cache.bump)
+            on_commit(session, partial(suggest_index.upsert, suggest_entry(new_item)))
             return new_item
 
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error creating New Item: {str(e)}",
             )
 
-    async def get_item(self, item_id: str, session: AsyncSession):
+    async def get_item(
+        self, item_id: str, session: AsyncSession, profile: str = "menu_listing"
+    ):
         try:
-            statement = select(Item).where(Item.uid == item_id)
+            statement = (
+                select(Item)
+                .where(Item.uid == item_id)
+                .options(*loader_profile(profile))
+            )
             result = await session.exec(statement)
             item_info = result.first()
             return item_info
         except Exception as e:
             raise Exception(f"Error getting Item Info -> {str(e)}")
 
+    async def get_items_by_ids(
+        self, item_ids: list, session: AsyncSession, profile: str = "menu_listing"
+    ) -> dict:
+        item_ids = list(set(item_ids))
+        if not item_ids:
+            return {}
+        try:
+            # One round trip for any number of ids
+            statement = (
+                select(Item)
+                .where(
+                    Item.uid
+                    == any_(
+                        bindparam("item_ids", value=item_ids, type_=pg.ARRAY(pg.UUID))
+                    )
+                )
+                .options(*loader_profile(profile))
+            )
+            result = await session.exec(statement)
+            return {item.uid: item for item in result.all()}
+        except Exception as e:
+            raise Exception(f"Error getting Items Info -> {str(e)}")
+
+    async def get_item_prices(self, item_ids: list, session: AsyncSession) -> dict:
+        statement = select(Item.uid, Item.price).where(
+            Item.uid
+            == any_(bindparam("item_ids", value=item_ids, type_=pg.ARRAY(pg.UUID)))
+        )
+        return {row.uid: row.price for row in (await session.exec(statement)).all()}
+
+    # The newest claim wins, an older upload finishing later is discarded
+    async def claim_image_upload(
+        self, entity: str, owner_id: uuid.UUID, session: AsyncSession
+    ) -> uuid.UUID:
+        image_owner = IMAGE_OWNERS[entity]
+        upload_token = uuid.uuid4()
+        await session.execute(
+            update(image_owner)
+            .where(image_owner.uid == owner_id)
+            .values(image_upload_token=upload_token)
+        )
+        return upload_token
+
+    async def swap_image(
+        self,
+        entity: str,
+        owner_id: uuid.UUID,
+        upload_token: uuid.UUID,
+        image_url: str,
+        session: AsyncSession,
+    ) -> bool:
+        image_owner = IMAGE_OWNERS[entity]
+        result = await session.execute(
+            update(image_owner)
+            .where(
+                image_owner.uid == owner_id,
+                image_owner.__table__.c.image_upload_token == upload_token,
+            )
+            .values(image=image_url, image_upload_token=None)
+        )
+        if result.rowcount == 0:
+            return False
+        await self.record_catalog_changes(entity, [owner_id], CHANGE_UPDATE, session)
+        if entity == "category":
+            await self.record_category_items_changed(owner_id, session)
+        on_commit(session, menu_cache.bump)
+        return True
+
+    # Image of an item or a category, looked up by either uid
+    async def get_image_url(self, owner_id: uuid.UUID, session: AsyncSession):
+        try:
+            item_statement = select(Item.image).where(Item.uid == owner_id)
+            item_image = (await session.exec(item_statement)).first()
+            if item_image is not None:
+                return item_image
+            category_statement = select(Category.image).where(Category.uid == owner_id)
+            return (await session.exec(category_statement)).first()
+        except Exception as e:
+            raise Exception(f"Error getting Image info -> {str(e)}")
+
+    async def get_item_details(self, item_id: str, session: AsyncSession):
+        item = await self.get_item(item_id, session, profile="item_detail")
+        if item is None:
+            return None
+        item_dict = convert_str(item.model_dump())
+        item_dict["categories"] = [category.name for category in item.categories]
+        return item_dict
+
     async def is_category_exist(self, category_name: str, session: AsyncSession):
         category_info = await self.get_category_details(category_name, session)
         print("Category Info: ", category_info)
@@ -74,13 +609,29 @@ class ItemService:
 
     async def get_category_details(self, category_name: str, session: AsyncSession):
         try:
-            statement = select(Category).where(Category.name == category_name)
+            statement = (
+                select(Category)
+                .where(Category.name == category_name)
+                .options(*loader_profile("category_detail"))
+            )
             result = await session.exec(statement)
             category_info = result.first()
             return category_info
         except Exception as e:
             raise Exception(f"Error getting category details: {str(e)}")
 
+    async def get_category(self, category_id, session: AsyncSession):
+        try:
+            statement = (
+                select(Category)
+                .where(Category.uid == category_id)
+                .options(*loader_profile("category_detail"))
+            )
+            result = await session.exec(statement)
+            return result.first()
+        except Exception as e:
+            raise Exception(f"Error getting category details: {str(e)}")
+
     async def create_new_category(
         self,
         category_info: CategorySchema,
@@ -101,11 +652,14 @@ class ItemService:
 
             new_category = Category(**category_info_dict, image=category_image_url)
             session.add(new_category)
-            await session.commit()
+            await session.flush()
             await session.refresh(new_category)
+            await self.record_catalog_changes(
+                "category", [new_category.uid], CHANGE_INSERT, session
+            )
+            on_commit(session, menu_cache.bump)
             return new_category
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error Creating New Category : {str(e)}",
@@ -119,12 +673,16 @@ class ItemService:
                 else:
                     ValueError(f"Invalid Key Attribute : {str(key)}")
 
-            await session.commit()
+            await session.flush()
             await session.refresh(item)
+            await self.record_catalog_changes(
+                "item", [item.uid], CHANGE_UPDATE, session
+            )
+            on_commit(session, menu_cache.bump)
+            on_commit(session, partial(suggest_index.upsert, suggest_entry(item)))
             return item
 
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error Updating Item: {str(e)}",
@@ -140,12 +698,16 @@ class ItemService:
                 else:
                     ValueError(f"Invalid Key Attribute : {str(key)}")
 
-            await session.commit()
+            await session.flush()
             await session.refresh(category)
+            await self.record_catalog_changes(
+                "category", [category.uid], CHANGE_UPDATE, session
+            )
+            await self.record_category_items_changed(category.uid, session)
+            on_commit(session, menu_cache.bump)
             return category
 
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error Updating Category: {str(e)}",
@@ -156,11 +718,16 @@ class ItemService:
             statement = select(Item).where(Item.uid == item_id)
             result = await session.exec(statement)
             item = result.one()
+            item_uid = item.uid
             await session.delete(item)
-            await session.commit()
+            await session.flush()
+            await self.record_catalog_changes(
+                "item", [item_uid], CHANGE_DELETE, session
+            )
+            on_commit(session, menu_cache.bump)
+            on_commit(session, partial(suggest_index.remove, str(item_uid)))
             return True
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error on deleting Item: {str(e)}",
@@ -171,11 +738,21 @@ class ItemService:
             statement = select(Category).where(Category.name == category_name)
             result = await session.exec(statement)
             category = result.one()
+            category_uid = category.uid
+            # Read the linked items before the cascade removes the links
+            item_ids = await self.get_category_item_ids(category_uid, session)
             await session.delete(category)
-            await session.commit()
+            await session.flush()
+            # The change log lock comes after the row writes, like every other writer
+            await self.record_catalog_changes(
+                "item", item_ids, CHANGE_UPDATE, session
+            )
+            await self.record_catalog_changes(
+                "category", [category_uid], CHANGE_DELETE, session
+            )
+            on_commit(session, menu_cache.bump)
             return True
         except Exception as e:
-            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error on deleting Category: {str(e)}",
@@ -0,0 +1,162 @@
+from sqlmodel import select
+from typing import Optional
+import asyncio
+import bisect
+import logging
+
+from src.db.models import Item, Catalog_Change
+from src.db.main import async_session_factory
+from .cache import menu_cache
+
+SUGGEST_MAX_RESULTS = 20
+# More item changes than this since the last refresh and a full rebuild is cheaper
+SUGGEST_MAX_DELTA = 500
+
+
+def normalize_suggest_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def suggest_keys(name: str, sku: str) -> set:
+    # Every word of the name starts a key, so "pizza" finds "Margherita Pizza"
+    name_words = normalize_suggest_text(name).split(" ")
+    keys = {" ".join(name_words[index:]) for index in range(len(name_words))}
+    keys.add(normalize_suggest_text(sku))
+    keys.discard("")
+    return keys
+
+
+def build_suggest_keys(rows) -> tuple[dict, list]:
+    items = {
+        str(row.uid): {"uid": str(row.uid), "name": row.name, "sku": row.sku}
+        for row in rows
+    }
+    keys = sorted(
+        (key, item_uid)
+        for item_uid, item in items.items()
+        for key in suggest_keys(item["name"], item["sku"])
+    )
+    return items, keys
+
+
+def item_service():
+    # Imported on use, the service module imports this one for suggest_index
+    from .service import ItemService
+
+    return ItemService()
+
+
+class SuggestIndex:
+    """Per worker sorted array of item name and SKU keys for typeahead.
+
+    The writing worker patches the index after commit. Every worker applies the
+    item rows in catalog_changes since its last refresh in the background once
+    it sees a new catalog version, and only rebuilds fully after a large import.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.changes_version: Optional[int] = None
+        self._keys: list[tuple] = []
+        self._items: dict = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _add(self, item: dict):
+        self._items[item["uid"]] = item
+        for key in suggest_keys(item["name"], item["sku"]):
+            bisect.insort(self._keys, (key, item["uid"]))
+
+    def _discard(self, item_uid: str):
+        item = self._items.pop(item_uid, None)
+        if item is None:
+            return
+        for key in suggest_keys(item["name"], item["sku"]):
+            position = bisect.bisect_left(self._keys, (key, item_uid))
+            if position < len(self._keys) and self._keys[position] == (key, item_uid):
+                del self._keys[position]
+
+    async def upsert(self, item: dict):
+        self._discard(item["uid"])
+        self._add(item)
+
+    async def remove(self, item_uid: str):
+        self._discard(item_uid)
+
+    async def rebuild(self):
+        version = await menu_cache.current_version()
+        # Primary, a lagging replica could miss the write that bumped the version
+        async with async_session_factory() as session:
+            changes_version = await item_service().get_changes_version(session)
+            statement = select(Item.uid, Item.name, Item.sku)
+            rows = (await session.exec(statement)).all()
+        # Sorting every key is CPU bound, keep it off the event loop
+        items, keys = await asyncio.to_thread(build_suggest_keys, rows)
+        # Swapped in one step, readers never see a half built index
+        self._items, self._keys = items, keys
+        self.version, self.changes_version = version, changes_version
+
+    async def catch_up(self):
+        if self.changes_version is None:
+            await self.rebuild()
+            return
+        version = await menu_cache.current_version()
+        async with async_session_factory() as session:
+            changes_version = await item_service().get_changes_version(session)
+            changes_statement = (
+                select(Catalog_Change.entity_id)
+                .where(
+                    Catalog_Change.version > self.changes_version,
+                    Catalog_Change.version <= changes_version,
+                    Catalog_Change.entity == "item",
+                )
+                .limit(SUGGEST_MAX_DELTA + 1)
+            )
+            item_ids = set((await session.exec(changes_statement)).all())
+            if len(item_ids) > SUGGEST_MAX_DELTA:
+                rows = None
+            else:
+                statement = select(Item.uid, Item.name, Item.sku).where(
+                    Item.uid.in_(item_ids)
+                )
+                rows = (await session.exec(statement)).all() if item_ids else []
+        if rows is None:
+            await self.rebuild()
+            return
+        # Items missing from the table were deleted
+        found_items = {str(row.uid): row for row in rows}
+        for item_id in item_ids:
+            self._discard(str(item_id))
+            row = found_items.get(str(item_id))
+            if row is not None:
+                self._add({"uid": str(row.uid), "name": row.name, "sku": row.sku})
+        self.version, self.changes_version = version, changes_version
+
+    async def _catch_up_in_background(self):
+        try:
+            await self.catch_up()
+        except Exception:
+            logging.exception("Could not refresh the suggest index")
+
+    async def refresh_if_stale(self):
+        version = await menu_cache.current_version()
+        if version is None or version == self.version:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._catch_up_in_background())
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_MAX_RESULTS) -> list[dict]:
+        prefix = normalize_suggest_text(prefix)
+        if not prefix:
+            return []
+        suggestions = {}
+        position = bisect.bisect_left(self._keys, (prefix,))
+        while position < len(self._keys) and len(suggestions) < limit:
+            key, item_uid = self._keys[position]
+            if not key.startswith(prefix):
+                break
+            suggestions.setdefault(item_uid, self._items[item_uid])
+            position += 1
+        return list(suggestions.values())
+
+
+suggest_index = SuggestIndex()
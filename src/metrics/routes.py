@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import JSONResponse
+from src.db.main import get_pool_status
+from src.auth.utils import password_hash_pool
+from src.images.uploads import image_upload_queue
+from src.auth.dependencies import RoleChecker
+
+admin_checker = Depends(RoleChecker(["admin"]))
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/db_pool", dependencies=[admin_checker])
+async def get_db_pool_stats():
+    try:
+        return JSONResponse(
+            content={
+                "message": "Database pool statistics fetched successfully",
+                "pool": get_pool_status(),
+            },
+            status_code=status.HTTP_200_OK,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting pool statistics -> {str(e)}",
+        )
+
+
+@metrics_router.get("/password_hashing", dependencies=[admin_checker])
+async def get_password_hashing_stats():
+    try:
+        return JSONResponse(
+            content={
+                "message": "Password hashing statistics fetched successfully",
+                "password_hashing": password_hash_pool.stats(),
+            },
+            status_code=status.HTTP_200_OK,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting password hashing statistics -> {str(e)}",
+        )
+
+
+@metrics_router.get("/image_uploads", dependencies=[admin_checker])
+async def get_image_upload_stats():
+    try:
+        return JSONResponse(
+            content={
+                "message": "Image upload statistics fetched successfully",
+                "image_uploads": image_upload_queue.stats(),
+            },
+            status_code=status.HTTP_200_OK,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting image upload statistics -> {str(e)}",
+        )
@@ -0,0 +1,42 @@
+import pytest
+
+from src.items_Categories.service import read_bulk_import_rows
+
+
+def test_csv_rows_drop_empty_and_extra_columns():
+    content = (
+        "name,sku,price,image\n"
+        "Margherita,PZ-MAR,250,\n"
+        "Pepperoni,PZ-PEP,300,https://res.cloudinary.com/p.png,extra\n"
+    ).encode()
+    assert read_bulk_import_rows("items.CSV", content) == [
+        {"name": "Margherita", "sku": "PZ-MAR", "price": "250"},
+        {
+            "name": "Pepperoni",
+            "sku": "PZ-PEP",
+            "price": "300",
+            "image": "https://res.cloudinary.com/p.png",
+        },
+    ]
+
+
+def test_csv_byte_order_mark_is_ignored():
+    content = b"\xef\xbb\xbfname,sku\nMargherita,PZ-MAR\n"
+    assert read_bulk_import_rows("items.csv", content) == [
+        {"name": "Margherita", "sku": "PZ-MAR"}
+    ]
+
+
+def test_json_lines_skip_blank_lines():
+    content = b'{"name": "Margherita", "sku": "PZ-MAR"}\n\n{"sku": "PZ-PEP"}\n'
+    assert read_bulk_import_rows("items.jsonl", content) == [
+        {"name": "Margherita", "sku": "PZ-MAR"},
+        {"sku": "PZ-PEP"},
+    ]
+
+
+@pytest.mark.parametrize("bad_line", ["not json", "[1, 2]", '"text"'])
+def test_json_lines_report_the_bad_line(bad_line):
+    content = f'{{"sku": "PZ-MAR"}}\n{bad_line}\n'.encode()
+    with pytest.raises(ValueError, match="Line 2"):
+        read_bulk_import_rows("items.jsonl", content)
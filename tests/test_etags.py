@@ -0,0 +1,52 @@
+from starlette.requests import Request
+
+from src.db.etags import make_etag, etag_matches, not_modified
+
+
+def request_with_headers(headers: dict) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def test_make_etag_is_quoted_and_stable():
+    etag = make_etag("item", 3, "abc")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("item", 3, "abc")
+    assert etag != make_etag("item", 4, "abc")
+
+
+def test_etag_matches_any_listed_tag():
+    etag = make_etag("menu", 1, "br")
+    request = request_with_headers({"If-None-Match": f'"other", {etag}'})
+    assert etag_matches(request, etag)
+
+
+def test_etag_matches_ignores_weak_prefix_and_star():
+    etag = make_etag("menu", 1, "gzip")
+    assert etag_matches(request_with_headers({"If-None-Match": f"W/{etag}"}), etag)
+    assert etag_matches(request_with_headers({"If-None-Match": "*"}), etag)
+
+
+def test_etag_does_not_match_without_header_or_other_tag():
+    etag = make_etag("menu", 2, "identity")
+    assert not etag_matches(request_with_headers({}), etag)
+    stale_etag = make_etag("menu", 1, "identity")
+    assert not etag_matches(
+        request_with_headers({"If-None-Match": stale_etag}), etag
+    )
+
+
+def test_not_modified_carries_the_etag():
+    etag = make_etag("order", "abc", 5)
+    response = not_modified(etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+import hashlib
+import io
+import pytest
+
+from src.config import settings
+from src.images.uploads import _ingest, READ_CHUNK_SIZE
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.parametrize(
+    "header, extension",
+    [
+        (b"\xff\xd8\xff\xe0", ".jpg"),
+        (PNG_SIGNATURE, ".png"),
+        (b"GIF87a", ".gif"),
+        (b"GIF89a", ".gif"),
+    ],
+)
+def test_accepts_known_signatures(header, extension):
+    content = header + b"\x00" * (READ_CHUNK_SIZE * 2 + 10)
+    image = _ingest(io.BytesIO(content))
+    try:
+        assert image.extension == extension
+        assert image.size == len(content)
+        assert image.sha256 == hashlib.sha256(content).hexdigest()
+        assert image.file.read() == content
+    finally:
+        image.file.close()
+
+
+@pytest.mark.parametrize("content", [b"", b"<svg></svg>", b"%PDF-1.7"])
+def test_rejects_unknown_content(content):
+    with pytest.raises(HTTPException) as error:
+        _ingest(io.BytesIO(content))
+    assert error.value.status_code == 400
+
+
+def test_rejects_oversized_images(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_MAX_UPLOAD_BYTES", READ_CHUNK_SIZE)
+    content = PNG_SIGNATURE + b"\x00" * READ_CHUNK_SIZE
+    with pytest.raises(HTTPException) as error:
+        _ingest(io.BytesIO(content))
+    assert error.value.status_code == 413
@@ -0,0 +1,81 @@
+from PIL import Image
+import io
+import os
+import pytest
+
+from src.images.proxy import (
+    DiskLRUCache,
+    is_allowed_source_url,
+    render_variant,
+    snap_width,
+    IMAGE_VARIANT_WIDTHS,
+)
+from src.db.models import DEFAULT_IMAGE_URL
+
+
+def put_with_age(cache: DiskLRUCache, key: str, content: bytes, age: int):
+    cache.put(key, content)
+    timestamp = 1_000_000 + age
+    os.utime(cache._path(key), (timestamp, timestamp))
+
+
+def test_cache_round_trip(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=1024)
+    assert cache.get("missing") is None
+    cache.put("variant", b"rendered")
+    assert cache.get("variant") == b"rendered"
+
+
+def test_eviction_removes_least_recently_read_first(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=300)
+    put_with_age(cache, "oldest", b"a" * 100, age=1)
+    put_with_age(cache, "middle", b"b" * 100, age=2)
+    put_with_age(cache, "newest", b"c" * 100, age=3)
+    # Reading touches the file, so the oldest write becomes the newest read
+    assert cache.get("oldest") is not None
+    cache.put("overflow", b"d" * 100)
+    assert cache.get("middle") is None
+    assert cache.get("oldest") is not None
+    assert cache.get("overflow") is not None
+
+
+def test_eviction_frees_down_to_the_low_watermark(tmp_path):
+    cache = DiskLRUCache(tmp_path, max_bytes=1000)
+    for age in range(10):
+        put_with_age(cache, f"variant-{age}", b"x" * 100, age=age)
+    cache.put("overflow", b"x" * 100)
+    remaining = sum(path.stat().st_size for path in tmp_path.iterdir())
+    assert remaining <= 900
+
+
+def test_snap_width_rounds_up_to_a_rendered_width():
+    assert snap_width(None) == IMAGE_VARIANT_WIDTHS[-1]
+    assert snap_width(1) == IMAGE_VARIANT_WIDTHS[0]
+    assert snap_width(200) == 256
+    assert snap_width(256) == 256
+    assert snap_width(5000) == IMAGE_VARIANT_WIDTHS[-1]
+
+
+@pytest.mark.parametrize(
+    "source_url, allowed",
+    [
+        ("https://res.cloudinary.com/demo/image/upload/pizza.jpg", True),
+        ("http://res.cloudinary.com/demo/image/upload/pizza.jpg", True),
+        (DEFAULT_IMAGE_URL, True),
+        ("http://169.254.169.254/latest/meta-data/", False),
+        ("http://localhost:8000/static/a.png", False),
+        ("https://res.cloudinary.com@evil.example/pizza.jpg", False),
+        ("ftp://res.cloudinary.com/pizza.jpg", False),
+    ],
+)
+def test_only_allowlisted_sources_are_fetched(source_url, allowed):
+    assert is_allowed_source_url(source_url) is allowed
+
+
+def test_render_variant_shrinks_but_never_enlarges():
+    source = io.BytesIO()
+    Image.new("RGBA", (400, 200), (255, 0, 0, 128)).save(source, format="PNG")
+    shrunk = Image.open(io.BytesIO(render_variant(source.getvalue(), 100, "jpeg")))
+    assert shrunk.format == "JPEG" and shrunk.size == (100, 50)
+    kept = Image.open(io.BytesIO(render_variant(source.getvalue(), 1024, "webp")))
+    assert kept.format == "WEBP" and kept.size == (400, 200)
@@ -0,0 +1,16 @@
+import io
+
+from src.images.storage import LocalStorage
+
+
+def test_local_storage_writes_under_the_content_hash(tmp_path):
+    storage = LocalStorage(str(tmp_path), "/static/uploads/")
+    image_url = storage.upload(io.BytesIO(b"image bytes"), "abc123", ".png")
+    assert image_url == "/static/uploads/abc123.png"
+    assert (tmp_path / "abc123.png").read_bytes() == b"image bytes"
+
+
+def test_local_storage_creates_missing_directory(tmp_path):
+    storage = LocalStorage(str(tmp_path / "nested" / "uploads"), "/static/uploads")
+    storage.upload(io.BytesIO(b"gif"), "def456", ".gif")
+    assert (tmp_path / "nested" / "uploads" / "def456.gif").exists()
@@ -0,0 +1,115 @@
+from decimal import Decimal
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from types import SimpleNamespace
+import pytest
+import uuid
+
+from src.auth.dependencies import get_current_user
+from src.db.models import Item
+from src.images import uploads
+from src.images.storage import LocalStorage
+from src.items_Categories import routes
+
+PNG_CONTENT = b"\x89PNG\r\n\x1a\n" + b"\x00" * 256
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value):
+        self.values[key] = value.encode()
+
+
+@pytest.fixture
+def upload_flow(tmp_path, monkeypatch):
+    item = Item(
+        uid=uuid.uuid4(),
+        name="Margherita",
+        description="Classic",
+        sku="PZ-MAR",
+        size="MEDIUM",
+        price=Decimal("250.00"),
+        image="https://res.cloudinary.com/old.png",
+    )
+    swaps = []
+    queue = uploads.ImageUploadQueue(concurrency=1)
+
+    async def get_item(item_id, session, profile="menu_listing"):
+        return item
+
+    async def update_Item(item, updated_item, session):
+        return item
+
+    async def claim_image_upload(entity, owner_id, session):
+        return uuid.uuid4()
+
+    async def swap_image(entity, owner_id, upload_token, image_url):
+        swaps.append((entity, owner_id, image_url))
+
+    monkeypatch.setattr(routes.item_service, "get_item", get_item)
+    monkeypatch.setattr(routes.item_service, "update_Item", update_Item)
+    monkeypatch.setattr(routes.item_service, "claim_image_upload", claim_image_upload)
+    monkeypatch.setattr(routes, "swap_image", swap_image)
+    monkeypatch.setattr(routes, "image_upload_queue", queue)
+    monkeypatch.setattr(uploads, "client", MemoryRedis())
+    monkeypatch.setattr(
+        uploads, "image_storage", LocalStorage(str(tmp_path), "/static/uploads")
+    )
+
+    app = FastAPI()
+    app.include_router(routes.item_router)
+    # The role checker still opens the unit of work before the image is ingested
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(role="admin")
+    with TestClient(app) as client:
+        yield SimpleNamespace(
+            client=client, item=item, queue=queue, swaps=swaps, tmp_path=tmp_path
+        )
+
+
+def test_update_uploads_the_image_after_commit(upload_flow):
+    response = upload_flow.client.patch(
+        f"/update/{upload_flow.item.uid}",
+        files={"image_file": ("pizza.png", PNG_CONTENT, "image/png")},
+    )
+    assert response.status_code == 202
+    upload_flow.client.portal.call(upload_flow.queue.drain)
+
+    assert upload_flow.queue.stats() == {"pending": 0, "uploaded": 1, "failed": 0}
+    [(entity, owner_id, image_url)] = upload_flow.swaps
+    assert (entity, owner_id) == ("item", upload_flow.item.uid)
+    stored_file = upload_flow.tmp_path / image_url.rsplit("/", 1)[-1]
+    assert stored_file.read_bytes() == PNG_CONTENT
+
+
+def test_rolled_back_update_never_uploads_and_closes_the_file(
+    upload_flow, monkeypatch
+):
+    ingested = []
+    original_ingest = uploads._ingest
+
+    def record_ingest(source):
+        image = original_ingest(source)
+        ingested.append(image)
+        return image
+
+    def fail_after_upload_is_registered(value):
+        raise ValueError("Response could not be built")
+
+    monkeypatch.setattr(uploads, "_ingest", record_ingest)
+    monkeypatch.setattr(routes, "convert_str", fail_after_upload_is_registered)
+    response = upload_flow.client.patch(
+        f"/update/{upload_flow.item.uid}",
+        files={"image_file": ("pizza.png", PNG_CONTENT, "image/png")},
+    )
+    assert response.status_code >= 400
+    upload_flow.client.portal.call(upload_flow.queue.drain)
+
+    assert upload_flow.queue.stats()["uploaded"] == 0
+    assert upload_flow.swaps == []
+    [image] = ingested
+    assert image.queued and image.file.closed
@@ -0,0 +1,86 @@
+import asyncio
+
+from src.items_Categories import cache as cache_module
+from src.items_Categories.cache import MenuCache
+
+
+def test_search_entries_never_evict_menu_entries():
+    cache = MenuCache(separate_limits={"search": 2})
+    cache.version = 1
+    cache.set(("menu",), "snapshot", 1)
+    for keystroke in ["p", "pi", "piz", "pizz", "pizza"]:
+        cache.set(("search", keystroke, 20), [], 1)
+    assert cache.get(("menu",)) == "snapshot"
+    assert cache.get(("search", "p", 20)) is None
+    assert cache.get(("search", "pizza", 20)) == []
+
+
+def test_entries_from_another_version_are_not_stored():
+    cache = MenuCache()
+    cache.version = 2
+    cache.set(("item", "1"), {"uid": "1"}, 1)
+    assert cache.get(("item", "1")) is None
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        value = self.values.get(key)
+        return str(value).encode() if value is not None else None
+
+    async def set(self, key, value, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = int(value)
+        return True
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, redis: MemoryRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def set(self, key, value, nx=False):
+        self.commands.append(("set", key, value, nx))
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    async def execute(self):
+        results = []
+        for command in self.commands:
+            if command[0] == "set":
+                _, key, value, nx = command
+                results.append(await self.redis.set(key, value, nx=nx))
+            else:
+                self.redis.values[command[1]] += 1
+                results.append(self.redis.values[command[1]])
+        return results
+
+
+def test_lost_catalog_version_restarts_above_every_issued_version(monkeypatch):
+    redis = MemoryRedis()
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(cache_module, "client", redis)
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = MenuCache()
+    assert asyncio.run(cache.current_version()) == 1_700_000_000_000
+    asyncio.run(cache.bump())
+    assert cache.version == 1_700_000_000_001
+
+    # A flushed Redis must not hand out the old numbers again
+    now[0] += 1
+    redis.values.clear()
+    asyncio.run(cache.bump())
+    assert cache.version == 1_700_000_001_001
@@ -0,0 +1,33 @@
+import brotli
+import gzip
+import json
+import pytest
+
+from src.items_Categories.cache import MenuSnapshot, negotiate_encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("", "identity"),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.0, gzip;q=0", "identity"),
+        ("*", "br"),
+        ("GZIP", "gzip"),
+        ("deflate", "identity"),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_snapshot_bodies_decode_to_the_same_menu():
+    items = [{"uid": "1", "name": "Margherita", "price": "250.00"}]
+    snapshot = MenuSnapshot(7, items)
+    identity = snapshot.bodies["identity"]
+    assert gzip.decompress(snapshot.bodies["gzip"]) == identity
+    assert brotli.decompress(snapshot.bodies["br"]) == identity
+    assert json.loads(identity)["version"] == 7
+    assert json.loads(identity)["items"] == items
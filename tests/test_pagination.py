@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from fastapi import HTTPException
+import pytest
+import uuid
+
+from src.db.models import Item, Order
+from src.db.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip_keeps_column_types():
+    created_at = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+    order_id = uuid.uuid4()
+    cursor = encode_cursor([created_at, order_id])
+    assert decode_cursor(cursor, [Order.created_at, Order.uid]) == [
+        created_at,
+        order_id,
+    ]
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(["Margherita Pizza", uuid.uuid4()])
+    assert "=" not in cursor
+    assert "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor(["only one value"]),
+        encode_cursor(["Margherita", "not-a-uuid"]),
+    ],
+)
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, [Item.name, Item.uid])
+    assert error.value.status_code == 400
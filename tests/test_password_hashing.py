@@ -0,0 +1,85 @@
+from fastapi import HTTPException
+import asyncio
+import pytest
+import threading
+
+from src.auth import utils
+from src.auth.utils import PasswordHashPool
+
+
+def test_run_returns_the_worker_result():
+    pool = PasswordHashPool(workers=2, max_queue=0)
+    try:
+        assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+        assert pool.stats()["completed"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_saturated_pool_rejects_with_503():
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def saturate():
+        # Two calls fill the worker and the queue, the third is refused at once
+        running = [
+            asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            await pool.run(release.wait)
+        stats = pool.stats()
+        release.set()
+        await asyncio.gather(*running)
+        return error.value, stats
+
+    try:
+        error, stats = asyncio.run(saturate())
+    finally:
+        release.set()
+        pool.shutdown()
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert stats["in_flight"] == 2
+    assert stats["queue_depth"] == 1
+    assert stats["rejected"] == 1
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = str(value).encode()
+        self.expiry[key] = ex
+        return True
+
+
+def test_shared_rounds_are_kept_per_target_and_expire(monkeypatch):
+    redis = MemoryRedis()
+    pool = PasswordHashPool(workers=1, max_queue=0)
+    monkeypatch.setattr(utils, "client", redis)
+    monkeypatch.setattr(utils, "password_hash_pool", pool)
+    monkeypatch.setattr(utils, "_calibrate_rounds", lambda target_ms: 13)
+    monkeypatch.setattr(utils.settings, "PASSWORD_HASH_TARGET_MS", 250)
+    try:
+        assert asyncio.run(utils._shared_calibrated_rounds()) == 13
+        # A new target does not reuse the pick made for the old one
+        monkeypatch.setattr(utils, "_calibrate_rounds", lambda target_ms: 14)
+        monkeypatch.setattr(utils.settings, "PASSWORD_HASH_TARGET_MS", 500)
+        assert asyncio.run(utils._shared_calibrated_rounds()) == 14
+    finally:
+        pool.shutdown()
+    assert set(redis.values) == {
+        "password_hash:rounds:250",
+        "password_hash:rounds:500",
+    }
+    assert set(redis.expiry.values()) == {
+        utils.settings.PASSWORD_HASH_CALIBRATION_TTL_SECONDS
+    }
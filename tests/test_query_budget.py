@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+import pytest
+
+from src.db.instrumentation import (
+    assert_max_queries,
+    instrument_engine,
+    track_queries,
+    QueryBudgetExceeded,
+    QueryStats,
+)
+
+
+@pytest.fixture
+def engine():
+    # instrument_engine only needs the sync engine behind an AsyncEngine
+    sync_engine = create_engine("sqlite://")
+    instrument_engine(SimpleNamespace(sync_engine=sync_engine))
+    yield sync_engine
+    sync_engine.dispose()
+
+
+def run_queries(engine, count: int):
+    with engine.connect() as conn:
+        for _ in range(count):
+            conn.execute(text("SELECT 1"))
+
+
+def test_track_queries_counts_statements(engine):
+    with track_queries() as stats:
+        run_queries(engine, 3)
+    assert stats.query_count == 3
+
+
+def test_queries_outside_tracking_are_not_counted(engine):
+    run_queries(engine, 2)
+    with track_queries() as stats:
+        pass
+    assert stats.query_count == 0
+
+
+def test_assert_max_queries_within_budget(engine):
+    with assert_max_queries(2) as stats:
+        run_queries(engine, 2)
+    assert stats.query_count == 2
+
+
+def test_assert_max_queries_over_budget(engine):
+    with pytest.raises(QueryBudgetExceeded):
+        with assert_max_queries(1):
+            run_queries(engine, 2)
+
+
+def test_repeated_statements_reports_n_plus_one():
+    stats = QueryStats()
+    for _ in range(5):
+        stats.record("SELECT * FROM items WHERE uid = $1", 0.001, 1)
+    stats.record("SELECT * FROM categories", 0.001, 3)
+    repeated = stats.repeated_statements(threshold=5)
+    assert repeated == [
+        {"statement": "SELECT * FROM items WHERE uid = $1", "count": 5}
+    ]
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+from src.items_Categories.suggest import (
+    SuggestIndex,
+    build_suggest_keys,
+    suggest_keys,
+)
+
+
+def item(uid: str, name: str, sku: str) -> dict:
+    return {"uid": uid, "name": name, "sku": sku}
+
+
+@pytest.fixture
+def index():
+    suggest_index = SuggestIndex()
+    asyncio.run(suggest_index.upsert(item("1", "Margherita Pizza", "PZ-MAR")))
+    asyncio.run(suggest_index.upsert(item("2", "Pepperoni Pizza", "PZ-PEP")))
+    asyncio.run(suggest_index.upsert(item("3", "Garlic Bread", "SD-GAR")))
+    return suggest_index
+
+
+def suggested_uids(index: SuggestIndex, prefix: str, limit: int = 20) -> list:
+    return [entry["uid"] for entry in index.suggest(prefix, limit=limit)]
+
+
+def test_suggest_keys_start_at_every_word_and_the_sku():
+    assert suggest_keys("Margherita  Pizza", "PZ-MAR") == {
+        "margherita pizza",
+        "pizza",
+        "pz-mar",
+    }
+
+
+def test_prefix_matches_any_word_case_insensitively(index):
+    assert suggested_uids(index, "PIZ") == ["1", "2"]
+    assert suggested_uids(index, "gar") == ["3"]
+    assert suggested_uids(index, "pz-p") == ["2"]
+
+
+def test_limit_and_no_match(index):
+    assert len(suggested_uids(index, "p", limit=1)) == 1
+    assert suggested_uids(index, "calzone") == []
+
+
+def test_blank_prefix_suggests_nothing(index):
+    assert suggested_uids(index, "   ") == []
+
+
+def test_upsert_replaces_old_keys(index):
+    asyncio.run(index.upsert(item("3", "Cheesy Bread", "SD-CHE")))
+    assert suggested_uids(index, "garlic") == []
+    assert suggested_uids(index, "chee") == ["3"]
+
+
+def test_remove_drops_every_key(index):
+    asyncio.run(index.remove("1"))
+    assert suggested_uids(index, "margherita") == []
+    assert suggested_uids(index, "pizza") == ["2"]
+
+
+def test_build_suggest_keys_matches_incremental_index(index):
+    rows = [
+        SimpleNamespace(uid=entry["uid"], name=entry["name"], sku=entry["sku"])
+        for entry in index._items.values()
+    ]
+    items, keys = build_suggest_keys(rows)
+    assert items == index._items
+    assert keys == index._keys